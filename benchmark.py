@@ -0,0 +1,745 @@
+import argparse
+import datetime
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from rent_cache import SplitCache
+from rent_ledger import PaymentLedger
+from rent_engine import split_household, split_households, split_portfolio, tenant_keys, SplitModel
+from rent_portfolio import run_portfolio
+from rent_records import Household, Portfolio
+from rent_report import ReportWriter, render_report, FORMATS
+from rent_scenarios import ScenarioSweep, scenario_grid, utility_subsets
+from rent_server import start_server
+from rent_snapshot import log_stamp, open_snapshot, write_snapshot
+from rent_storage import Autosaver, RentLog
+
+
+def make_households(n_tenants, seed=42):
+    rng = random.Random(seed)
+    households = []
+    made = 0
+    while made < n_tenants:
+        size = min(rng.randint(2, 6), n_tenants - made)
+        split_type = ('equal', 'room', 'custom')[len(households) % 3]
+        tenants = []
+        for j in range(size):
+            tenants.append({
+                'name': f"Tenant {made + j}",
+                'room_size': float(rng.randint(80, 250)),
+                'percentage': 100 / size
+            })
+        households.append({
+            'rent_amount': float(rng.randint(8000, 60000)),
+            'maintenance': float(rng.randint(0, 3000)),
+            'security_deposit': 0,
+            'utilities': {
+                "⚡ Electricity": {'amount': 1500.0, 'split_method': 'Equal', 'notes': ''},
+                "💧 Water": {'amount': 500.0, 'split_method': 'Equal', 'notes': ''}
+            },
+            'tenants': tenants,
+            'split_type': split_type
+        })
+        made += size
+    return households
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_split(sizes):
+    print(f"{'tenants':>10} {'loop (s)':>10} {'vector (s)':>11} {'loop t/s':>12} {'vector t/s':>12}")
+    for n in sizes:
+        households = make_households(n)
+        loop = timed(split_households, households)
+        vector = timed(split_portfolio, households)
+        print(f"{n:>10,} {loop:>10.3f} {vector:>11.3f} {n / loop:>12,.0f} {n / vector:>12,.0f}")
+
+
+def bench_exact(sizes):
+    print(f"{'tenants':>10} {'path':>7} {'float (s)':>10} {'paise (s)':>10} {'overhead':>9}")
+    for n in sizes:
+        households = make_households(n)
+        for path, fn in (('loop', split_households), ('vector', split_portfolio)):
+            fast = timed(fn, households)
+            exact = timed(lambda h: fn(h, exact=True), households)
+            print(f"{n:>10,} {path:>7} {fast:>10.3f} {exact:>10.3f} {exact / fast:>8.2f}x")
+
+
+def bench_autosave(sizes):
+    # the add_tenant pattern: mutate under the data lock, then mark dirty
+    print(f"{'edits':>10} {'edit loop (s)':>14} {'close (s)':>10} {'writes':>7}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = RentLog(os.path.join(tmp, 'data.jsonl'))
+            rent_data = {'rent_amount': 20000, 'utilities': {}, 'tenants': [], 'split_type': 'equal',
+                         'security_deposit': 0, 'maintenance': 0}
+            lock = threading.Lock()
+            autosaver = Autosaver(lambda: storage.encode(rent_data), storage.write, lock, delay=0.2)
+            start = time.perf_counter()
+            for i in range(n):
+                with lock:
+                    rent_data['tenants'].append({'name': f"Tenant {i}", 'percentage': 0, 'room_size': 0})
+                autosaver.mark()
+            edits = time.perf_counter() - start
+            start = time.perf_counter()
+            autosaver.close()
+            closing = time.perf_counter() - start
+            assert len(storage.last()['data']['tenants']) == n
+            print(f"{n:>10,} {edits:>14.3f} {closing:>10.3f} {autosaver.writes:>7}")
+
+
+def bench_incremental(sizes):
+    # one edit followed by a recalculation, the way the GUI does it:
+    # re-summing the totals from scratch vs. updating the running totals,
+    # then building every share from them
+    print(f"{'tenants':>10} {'edit':>16} {'re-sum (ms)':>12} {'running (ms)':>13} {'split (ms)':>11}")
+    for n in sizes:
+        household = make_households(n, seed=7)[0]
+        household['tenants'] = [{'name': f"Tenant {i}", 'room_size': 100.0 + i % 50, 'percentage': 0}
+                                for i in range(n)]
+        household['split_type'] = 'room'
+        model = SplitModel(household)
+        edits = (
+            ('add tenant', lambda: model.add_tenant({'id': 'new', 'name': 'New', 'room_size': 120.0,
+                                                     'percentage': 0})),
+            ('remove tenant', lambda: model.remove_tenant('new')),
+            ('add utility', lambda: model.set_utility('🌐 Internet', {'amount': 1000.0, 'split_method': 'Equal'})),
+            ('remove utility', lambda: model.remove_utility('🌐 Internet'))
+        )
+        for label, edit in edits:
+            running = timed(edit) * 1000
+            resum = min(timed(model.recount) for _ in range(5)) * 1000
+            split = min(timed(model.split) for _ in range(5)) * 1000
+            print(f"{n:>10,} {label:>16} {resum:>12.3f} {running:>13.3f} {split:>11.2f}")
+
+
+def bench_treeview(sizes):
+    # needs a display; compares filling and refreshing every row of a
+    # Treeview with the VirtualTree window used by the GUI
+    from rent_calculator import load_tk, VirtualTree
+    load_tk()
+    import tkinter as tk
+    from tkinter import ttk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped: no display ({e})")
+        return
+
+    columns = ('Name', 'Room Size (sq ft)', 'Percentage', 'Share (₹)')
+    print(f"{'rows':>10} {'mode':>8} {'startup (s)':>12} {'recalc (s)':>11}")
+    for n in sizes:
+        rows = {f"t{i}": (f"Tenant {i}", 'N/A', 'Equal', '₹0') for i in range(n)}
+        for mode in ('eager', 'virtual'):
+            tree = ttk.Treeview(root, columns=columns, show='headings', height=20)
+            scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL)
+            tree.pack()
+
+            start = time.perf_counter()
+            if mode == 'eager':
+                for row_id, values in rows.items():
+                    tree.insert('', 'end', iid=row_id, values=values)
+            else:
+                view = VirtualTree(tree, scrollbar, lambda: list(rows), rows.__getitem__)
+                view.refresh()
+            root.update()
+            startup = time.perf_counter() - start
+
+            for row_id, values in rows.items():
+                rows[row_id] = values[:3] + (f"₹{n:,.2f}",)
+            start = time.perf_counter()
+            if mode == 'eager':
+                for row_id, values in rows.items():
+                    tree.item(row_id, values=values)
+            else:
+                view.refresh()
+            root.update()
+            recalc = time.perf_counter() - start
+
+            print(f"{n:>10,} {mode:>8} {startup:>12.3f} {recalc:>11.3f}")
+            tree.destroy()
+            scrollbar.destroy()
+    root.destroy()
+
+
+def legacy_report(household, result, period, generated_on=None):
+    # the report as generate_report used to build it, one f-string per
+    # line joined at the end; kept as the baseline for bench_report
+    generated_on = generated_on or datetime.datetime.now()
+    report = []
+    report.append("=" * 70)
+    report.append("📊 RENT PAYMENT REPORT")
+    report.append("=" * 70)
+    report.append("")
+    report.append(f"Period: {period}")
+    report.append(f"Generated on: {generated_on.strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("📋 PAYMENT DETAILS")
+    report.append("-" * 70)
+    report.append(f"Monthly Rent:           ₹{household.get('rent_amount', 0):,.2f}")
+    report.append(f"Maintenance:            ₹{household.get('maintenance', 0):,.2f}")
+    report.append(f"Utilities:              ₹{result['utilities_total']:,.2f}")
+    report.append("-" * 70)
+    report.append(f"TOTAL MONTHLY:          ₹{result['total_monthly']:,.2f}")
+    report.append("")
+
+    report.append("👥 TENANT PAYMENT BREAKDOWN")
+    report.append("-" * 70)
+
+    split_type = result['split_type']
+    for i, tenant in enumerate(result['shares']):
+        share = tenant['share']
+        percentage = tenant['percentage']
+        if split_type == "equal":
+            report.append(f"{i+1}. {tenant['name']:20} ₹{share:,.2f}")
+        elif split_type == "room":
+            report.append(f"{i+1}. {tenant['name']:20} {tenant['room_size']:,.0f} sq ft ({percentage:.1f}%) = ₹{share:,.2f}")
+        else:
+            report.append(f"{i+1}. {tenant['name']:20} {percentage:.1f}% = ₹{share:,.2f}")
+
+    report.append("")
+    report.append("💡 UTILITIES DETAILS")
+    report.append("-" * 70)
+
+    if household.get('utilities'):
+        for name, util in household['utilities'].items():
+            report.append(f"{name:25} ₹{util['amount']:,.2f} ({util['split_method']})")
+    else:
+        report.append("No utilities added")
+
+    report.append("")
+    report.append("📋 PAYMENT INSTRUCTIONS")
+    report.append("-" * 70)
+    report.append("1. Please pay your share by the 5th of each month")
+    report.append("2. Use UPI, Bank Transfer, or Cash")
+    report.append("3. Keep transaction ID for reference")
+    report.append("4. Notify if payment will be delayed")
+    report.append("")
+    report.append("=" * 70)
+    return '\n'.join(report)
+
+
+def bench_report(sizes):
+    # n reports of one household each (2-6 tenants); "stream" writes them
+    # all through one ReportWriter instead of building a string per report
+    print(f"{'reports':>10} {'renderer':>16} {'time (s)':>9} {'reports/s':>10}")
+    now = datetime.datetime.now()
+    for n in sizes:
+        households = make_households(4 * n)[:n]
+        results = [split_household(h) for h in households]
+        pairs = list(zip(households, results))
+
+        def legacy():
+            for household, result in pairs:
+                legacy_report(household, result, "October 2026", now)
+
+        def render(fmt):
+            for household, result in pairs:
+                render_report(household, result, "October 2026", fmt, generated_on=now)
+
+        def stream(fmt):
+            writer = ReportWriter(io.StringIO(), fmt).begin()
+            for household, result in pairs:
+                writer.write(household, result, "October 2026", now)
+            writer.end()
+
+        runs = [('legacy text', legacy)]
+        runs += [(f"{fmt}", lambda fmt=fmt: render(fmt)) for fmt in FORMATS]
+        runs += [(f"stream {fmt}", lambda fmt=fmt: stream(fmt)) for fmt in FORMATS]
+        for label, run in runs:
+            elapsed = timed(run)
+            print(f"{len(pairs):>10,} {label:>16} {elapsed:>9.3f} {len(pairs) / elapsed:>10,.0f}")
+
+
+def bench_cache(sizes):
+    # regenerating the report of an unchanged household (memory tier) and
+    # re-running a whole portfolio against a warm cache file (disk tier)
+    print(f"{'tenants':>10} {'case':>24} {'time (s)':>9} {'hits':>6} {'misses':>7}")
+    now = datetime.datetime.now()
+    for n in sizes:
+        household = make_households(n)[0]
+        household['tenants'] = [{'id': str(i), 'name': f"Tenant {i}", 'room_size': 100.0 + i % 50,
+                                 'percentage': 0} for i in range(n)]
+        cache = SplitCache()
+        for label in ('report, cold', 'report, cached'):
+            elapsed = timed(lambda: render_report(household, cache.split(household), "October 2026",
+                                                  generated_on=now))
+            print(f"{n:>10,} {label:>24} {elapsed:>9.3f} {cache.hits:>6} {cache.misses:>7}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'households.jsonl')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                for h in make_households(n):
+                    f.write(json.dumps(h, ensure_ascii=False) + '\n')
+            cache_path = os.path.join(tmp, 'cache.db')
+            for label, path in (('portfolio, no cache', None), ('portfolio, cold cache', cache_path),
+                                ('portfolio, warm cache', cache_path)):
+                out = os.path.join(tmp, 'out.jsonl')
+                start = time.perf_counter()
+                count, failed, cached = run_portfolio(input_path, out, 1, 500, False, None, None, 'text', path)
+                elapsed = time.perf_counter() - start
+                print(f"{n:>10,} {label:>24} {elapsed:>9.3f} {cached:>6} {count - cached:>7}")
+
+
+def bench_memory(sizes):
+    # memory held by a whole portfolio once loaded from JSONL lines, as
+    # plain dicts, as __slots__ records and as a columnar Portfolio
+    print(f"{'tenants':>10} {'form':>10} {'MB':>8} {'bytes/tenant':>13} {'load (s)':>9} {'split (s)':>10}")
+    for n in sizes:
+        lines = [json.dumps(h, ensure_ascii=False) for h in make_households(n)]
+        forms = (
+            ('dicts', lambda: [json.loads(line) for line in lines]),
+            ('slots', lambda: [Household.from_dict(json.loads(line)) for line in lines]),
+            ('columnar', lambda: Portfolio(json.loads(line) for line in lines))
+        )
+        for label, load in forms:
+            tracemalloc.start()
+            start = time.perf_counter()
+            portfolio = load()
+            elapsed = time.perf_counter() - start
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            split = timed(split_households, portfolio)
+            print(f"{n:>10,} {label:>10} {held / 2**20:>8.1f} {held / n:>13.0f} {elapsed:>9.2f} {split:>10.2f}")
+            del portfolio
+
+
+def bench_portfolio(sizes):
+    # month-end run: split and report every household at 1, 2, 4 and 8
+    # worker processes; throughput only scales up to the machine's cores
+    print(f"{'tenants':>10} {'households':>11} {'workers':>8} {'time (s)':>9} {'households/s':>13}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'households.jsonl')
+            households = make_households(n)
+            with open(input_path, 'w', encoding='utf-8') as f:
+                for household in households:
+                    f.write(json.dumps(household, ensure_ascii=False) + '\n')
+            for workers in (1, 2, 4, 8):
+                elapsed = timed(run_portfolio, input_path, os.path.join(tmp, f'out{workers}.jsonl'),
+                                workers, 500, False, None, os.path.join(tmp, 'reports.txt'))
+                print(f"{n:>10,} {len(households):>11,} {workers:>8} {elapsed:>9.3f} "
+                      f"{len(households) / elapsed:>13,.0f}")
+
+
+def make_prorated(n_tenants, share=0.2, seed=42):
+    # batch households for March 2026 where share of the tenants move in
+    # or out mid-month
+    rng = random.Random(seed)
+    households = make_households(n_tenants, seed)
+    for i, household in enumerate(households):
+        household.update(id=i, year=2026, month=3)
+        for tenant in household['tenants']:
+            if rng.random() < share:
+                day = rng.randint(2, 28)
+                tenant['move_in' if rng.random() < 0.5 else 'move_out'] = f"2026-03-{day:02d}"
+    return households
+
+
+def bench_proration(sizes):
+    # month-end split with 20% of tenants moving in or out mid-month:
+    # split_household() per household vs split_portfolio(), which works
+    # out the days for every tenant at once
+    print(f"{'tenants':>10} {'loop (s)':>10} {'vector (s)':>11} {'loop t/s':>12} {'vector t/s':>12}")
+    for n in sizes:
+        households = make_prorated(n)
+        loop = timed(split_households, households)
+        vector = timed(split_portfolio, households)
+        print(f"{n:>10,} {loop:>10.3f} {vector:>11.3f} {n / loop:>12,.0f} {n / vector:>12,.0f}")
+
+
+def cold_open(kind, log_path, snapshot_path, rows=20):
+    # what the GUI does at start: load the latest household (from the
+    # JSONL log or the binary snapshot), build its SplitModel, then read
+    # the first screen of tenants. Run in a fresh interpreter by
+    # bench_snapshot; prints the two times as JSON.
+    start = time.perf_counter()
+    if kind == 'json':
+        household = RentLog(log_path).last()['data']
+    else:
+        household = open_snapshot(snapshot_path, log_stamp(log_path)).household()
+    model = SplitModel(household)
+    opened = time.perf_counter()
+    ids = list(model.tenants)
+    screen = [model.tenants[tenant_id]['name'] for tenant_id in ids[:rows]]
+    print(json.dumps({'open': opened - start, 'screen': time.perf_counter() - opened, 'rows': len(screen)}))
+
+
+def evict(paths):
+    # drop the files from the page cache so the next open reads the disk
+    if hasattr(os, 'posix_fadvise'):
+        for path in paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def bench_snapshot(sizes):
+    # cold start with one household of n tenants: parsing the JSONL log
+    # vs opening the mmap'd binary snapshot, each in a new process with
+    # the files evicted from the page cache (where the OS allows it)
+    print(f"{'tenants':>10} {'format':>9} {'MB':>8} {'open (s)':>9} {'first screen (s)':>17}")
+    here = os.path.dirname(os.path.abspath(__file__))
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, 'data.jsonl')
+            snapshot_path = os.path.join(tmp, 'data.snap')
+            household = make_household(n, 'room')
+            RentLog(log_path).append(household, year=2026, month=1)
+            write_snapshot(snapshot_path, household, 2026, 1, source=log_stamp(log_path))
+            del household
+            files = {'json': [log_path, log_path + '.idx'], 'snapshot': [snapshot_path]}
+            for kind in ('json', 'snapshot'):
+                evict(files['json'] + files['snapshot'])
+                code = f"import benchmark; benchmark.cold_open({kind!r}, {log_path!r}, {snapshot_path!r})"
+                out = subprocess.run([sys.executable, '-c', code], cwd=here, check=True,
+                                     capture_output=True, text=True).stdout
+                times = json.loads(out)
+                size = sum(os.path.getsize(path) for path in files[kind])
+                print(f"{n:>10,} {kind:>9} {size / 2**20:>8.1f} {times['open']:>9.3f} {times['screen']:>17.3f}")
+
+
+def bench_startup(sizes):
+    # time to first paint of the GUI (rent_calculator.py --startup-time)
+    # with n tenants saved: the first start parses the JSONL log, the
+    # second opens the snapshot the first one wrote on exit. Needs a
+    # display.
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rent_calculator.py')
+    print(f"{'tenants':>10} {'start':>9} {'first paint (s)':>16}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            RentLog(os.path.join(tmp, 'rent_calculator_data.jsonl')).append(
+                make_household(n, 'room'), year=2026, month=1)
+            for label in ('json', 'snapshot'):
+                run = subprocess.run([sys.executable, script, '--startup-time'], cwd=tmp,
+                                     capture_output=True, text=True)
+                if run.returncode:
+                    print(f"Can't start the GUI here: {(run.stderr.strip().splitlines() or ['?'])[-1]}")
+                    return
+                seconds = json.loads(run.stdout.splitlines()[-1])['first_paint_s']
+                print(f"{n:>10,} {label:>9} {seconds:>16.3f}")
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def load_test(server, bodies, path, clients):
+    # every client thread keeps one connection open and posts its share
+    # of bodies back to back; returns (latencies, wall time)
+    latencies = []
+    lock = threading.Lock()
+    host, port = server.server_address[:2]
+
+    def client(mine):
+        conn = http.client.HTTPConnection(host, port)
+        times = []
+        for body in mine:
+            start = time.perf_counter()
+            conn.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            times.append(time.perf_counter() - start)
+            assert response.status == 200, response.status
+        conn.close()
+        with lock:
+            latencies.extend(times)
+
+    threads = [threading.Thread(target=client, args=(bodies[i::clients],)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), time.perf_counter() - start
+
+
+def bench_server(sizes):
+    # HTTP API under load: 2,000 single-household POSTs to /split and 20
+    # POSTs of 100 households to /split/batch, from 1, 4 and 16 concurrent
+    # clients (sizes); every request asks for the text report too
+    households = make_households(8_000)[:2_000]
+    singles = [json.dumps(h, ensure_ascii=False).encode('utf-8') for h in households]
+    batches = [json.dumps(households[i:i + 100], ensure_ascii=False).encode('utf-8')
+               for i in range(0, len(households), 100)]
+    print(f"{'endpoint':>12} {'clients':>8} {'requests':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'requests/s':>11} {'households/s':>13}")
+    for clients in sizes:
+        for path, bodies, per_request in (('/split', singles, 1), ('/split/batch', batches, 100)):
+            # a fresh server each time, so no run starts with a warm cache
+            server = start_server()
+            try:
+                latencies, elapsed = load_test(server, bodies, path + '?report=text', clients)
+            finally:
+                server.shutdown()
+                server.server_close()
+            print(f"{path:>12} {clients:>8} {len(latencies):>9,} {percentile(latencies, 50) * 1000:>9.2f} "
+                  f"{percentile(latencies, 99) * 1000:>9.2f} {len(latencies) / elapsed:>11,.0f} "
+                  f"{len(latencies) * per_request / elapsed:>13,.0f}")
+
+
+def bench_whatif(sizes):
+    # what-if sweep over one household of n tenants: 41 rent changes x 4
+    # maintenance amounts x 16 sets of added utilities x 4 split types
+    # (10,496 scenarios), against splitting every scenario separately
+    print(f"{'tenants':>10} {'scenarios':>10} {'sweep (s)':>10} {'one by one (s)':>15}")
+    for n in sizes:
+        household = make_household(n, 'room')
+        grid = scenario_grid([x / 2 for x in range(-20, 21)], [None, 1000, 2000, 3000],
+                             utility_subsets(["💧 Water", "🌐 Internet", "🗑️ Gas", "📺 Cable TV"]),
+                             [None, 'equal', 'room', 'custom'])
+        sweep = ScenarioSweep(household)
+        elapsed = timed(sweep.run, grid)
+        sample = grid[::100]
+
+        def one_by_one():
+            extra = sweep.extra
+            for scenario in sample:
+                h = dict(household, rent_amount=household['rent_amount'] * (1 + scenario.rent_change / 100),
+                         split_type=scenario.split_type or household['split_type'])
+                if scenario.maintenance is not None:
+                    h['maintenance'] = scenario.maintenance
+                h['utilities'] = dict(household['utilities'], **{name: extra[name] for name in scenario.add})
+                split_household(h)
+        loop = timed(one_by_one) * len(grid) / len(sample)
+        print(f"{n:>10,} {len(grid):>10,} {elapsed:>10.3f} {loop:>15.3f}")
+
+
+def bench_ledger(sizes):
+    # a year of charges and payments for n tenants (2 ledger rows per
+    # tenant per month), then balance-as-of and arrears queries against
+    # summing each tenant's history
+    rng = random.Random(42)
+    print(f"{'tenants':>10} {'rows':>11} {'load (s)':>9} {'balance as of (µs)':>19} "
+          f"{'replayed (µs)':>14} {'arrears (s)':>12} {'replayed (s)':>13}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = PaymentLedger(os.path.join(tmp, 'ledger.db'))
+            households = make_households(n)
+            results = [split_household(h) for h in households]
+
+            def load():
+                for month in range(1, 13):
+                    ledger.post_charges_many([(f"h{i}", 2026, month, None, result)
+                                              for i, result in enumerate(results)])
+                    ledger.record_payments([(f"h{i}", key, round(t['share'] * rng.choice((1, 1, 1, 0.5)), 2),
+                                             f"2026-{month:02}-{rng.randint(1, 28):02}", '')
+                                            for i, result in enumerate(results)
+                                            for key, t in zip(tenant_keys(result['shares']), result['shares'])])
+            load_time = timed(load)
+            rows = ledger.conn.execute('SELECT count(*) FROM ledger').fetchone()[0]
+
+            queries = [(f"h{i}", tenant_keys(results[i]['shares'])[0], f"2026-{rng.randint(1, 12):02}-15")
+                       for i in (rng.randrange(len(results)) for _ in range(2000))]
+            as_of = timed(lambda: [ledger.balance(*q) for q in queries]) / len(queries)
+            replayed = timed(lambda: [ledger.conn.execute(
+                'SELECT sum(amount) FROM ledger WHERE household = ? AND tenant = ? AND entry_date <= ?', q
+            ).fetchone() for q in queries]) / len(queries)
+            arrears = timed(ledger.arrears, '2026-12-31')
+            replayed_arrears = timed(lambda: ledger.conn.execute(
+                "SELECT household, tenant, sum(amount) AS owed FROM ledger WHERE entry_date <= '2026-12-31' "
+                "GROUP BY household, tenant HAVING owed > 0").fetchall())
+            ledger.close()
+        print(f"{n:>10,} {rows:>11,} {load_time:>9.2f} {as_of * 1e6:>19.1f} {replayed * 1e6:>14.1f} "
+              f"{arrears:>12.3f} {replayed_arrears:>13.3f}")
+
+
+def make_household(n_tenants, split_type, seed=42):
+    # one household of n tenants for the suite; custom percentages add up
+    # to exactly 100 and the By Usage utility has a reading per tenant
+    rng = random.Random(seed)
+    percentages = [100 / n_tenants] * n_tenants
+    tenants = []
+    for i in range(n_tenants):
+        tenants.append({
+            'id': f"t{i}",
+            'name': f"Tenant {i}",
+            'room_size': float(rng.randint(80, 250)),
+            'percentage': percentages[i],
+            'usage': {"⚡ Electricity": float(rng.randint(20, 400))}
+        })
+    return {
+        'rent_amount': 1000.0 * n_tenants,
+        'maintenance': 150.0 * n_tenants,
+        'security_deposit': 2000.0 * n_tenants,
+        'utilities': {
+            "⚡ Electricity": {'amount': 300.0 * n_tenants, 'split_method': 'By Usage', 'notes': ''},
+            "💧 Water": {'amount': 100.0 * n_tenants, 'split_method': 'Equal', 'notes': ''},
+            "🌐 Internet": {'amount': 1000.0, 'split_method': 'Custom', 'notes': ''}
+        },
+        'tenants': tenants,
+        'split_type': split_type
+    }
+
+
+def suite_cases(sizes, tmp):
+    # (name, tenants, setup) where setup() returns the function to time;
+    # the three paths the GUI takes: calculate_rent's split, the
+    # generate_report text and an autosave write/load_data round trip,
+    # the latter in files under tmp
+    for n in sizes:
+        for split_type in ('equal', 'room', 'custom'):
+            def calculate(n=n, split_type=split_type):
+                household = make_household(n, split_type)
+                model = SplitModel(household)
+                return model.split
+
+            def report(n=n, split_type=split_type):
+                household = make_household(n, split_type)
+                result = split_household(household)
+                now = datetime.datetime(2026, 1, 1)
+                return lambda: render_report(household, result, "January 2026", generated_on=now)
+
+            yield f"calculate/{split_type}/{n}", n, calculate
+            yield f"report/{split_type}/{n}", n, report
+
+        def save_load(n=n):
+            household = make_household(n, 'room')
+            path = os.path.join(tmp, f"save_load-{n}.jsonl")
+
+            def run():
+                # a new log every time, so the file doesn't grow with the
+                # number of loops
+                for stale in (path, path + '.idx'):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                storage = RentLog(path)
+                storage.append(household, year=2026, month=1)
+                loaded = RentLog(path).get('default', 2026, 1)
+                assert len(loaded['data']['tenants']) == n
+            return run
+
+        yield f"save_load/{n}", n, save_load
+
+
+def measure(fn, repeat, min_time):
+    # loops per sample are picked so each sample takes at least min_time;
+    # min and median are per call
+    loops = 1
+    while True:
+        elapsed = timed(lambda: [fn() for _ in range(loops)])
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= max(2, min(10, int(min_time / max(elapsed, 1e-9)) + 1))
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        samples.append(timed(lambda: [fn() for _ in range(loops)]) / loops)
+    return {'min_s': min(samples), 'median_s': statistics.median(samples), 'loops': loops, 'repeat': repeat}
+
+
+def run_suite(sizes, repeat=5, min_time=0.05):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, n, setup in suite_cases(sizes, tmp):
+            fn = setup()
+            results[name] = dict(measure(fn, repeat, min_time), tenants=n)
+            print(f"{name:>28} {results[name]['min_s'] * 1000:>11.3f} ms", file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'sizes': list(sizes),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, tolerance):
+    # a case regresses when its best time is more than `tolerance` slower
+    # than the baseline's best; returns the regressed case names
+    regressions = []
+    print(f"{'case':>28} {'baseline (ms)':>14} {'now (ms)':>10} {'change':>8}")
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:>28} {'-':>14} {now['min_s'] * 1000:>10.3f} {'new':>8}")
+            continue
+        ratio = now['min_s'] / before['min_s']
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:>28} {before['min_s'] * 1000:>14.3f} {now['min_s'] * 1000:>10.3f} "
+              f"{(ratio - 1) * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def bench_suite(sizes, args=None):
+    report = run_suite(sizes, args.repeat if args else 5)
+    if args and args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    if args and args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) more than {args.tolerance:.0%} slower than "
+                  f"{args.baseline}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+BENCHMARKS = {
+    'autosave': (bench_autosave, [10_000]),
+    'cache': (bench_cache, [100_000]),
+    'split': (bench_split, [1_000, 100_000, 1_000_000]),
+    'startup': (bench_startup, [10, 10_000, 100_000, 1_000_000]),
+    'exact': (bench_exact, [1_000, 100_000, 1_000_000]),
+    'incremental': (bench_incremental, [5_000]),
+    'ledger': (bench_ledger, [10_000, 100_000]),
+    'memory': (bench_memory, [1_000_000]),
+    'portfolio': (bench_portfolio, [100_000]),
+    'proration': (bench_proration, [100_000, 500_000]),
+    'report': (bench_report, [20_000]),
+    'server': (bench_server, [1, 4, 16]),
+    'snapshot': (bench_snapshot, [100_000, 1_000_000]),
+    'suite': (bench_suite, [10, 1_000, 100_000]),
+    'treeview': (bench_treeview, [10_000]),
+    'whatif': (bench_whatif, [4, 20, 200])
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rent calculator benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('sizes', nargs='*', type=int)
+    parser.add_argument('--json', metavar='PATH', help="suite: write the results as JSON here")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="suite: compare against results saved earlier with --json and exit 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="suite: allowed slowdown before a case counts as a regression (default: 0.25)")
+    parser.add_argument('--repeat', type=int, default=5, help="suite: samples per case (default: 5)")
+    args = parser.parse_args()
+    bench, default_sizes = BENCHMARKS[args.benchmark]
+    if bench is bench_suite:
+        return bench_suite(args.sizes or default_sizes, args)
+    bench(args.sizes or default_sizes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
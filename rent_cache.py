@@ -0,0 +1,141 @@
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+
+from rent_engine import is_prorated, split_household
+
+CACHE_SIZE = 256
+
+
+class SplitCache:
+    # Memoizes split_household() by a hash of everything the split depends
+    # on (rent, maintenance, utilities, tenants, split type and exactness),
+    # so an unchanged household is never split twice. The newest
+    # `maxsize` results stay in memory (least recently used go first);
+    # with a path, results are also kept in an SQLite file that outlives
+    # the process. Cached results are shared, so callers must not modify
+    # them.
+    #
+    # Batch runs use the file directly through load_encoded() and
+    # store_encoded(): there the key is a hash of the input line and the
+    # value the encoded output, so a re-run of an unchanged household
+    # skips parsing, splitting and encoding alike.
+
+    def __init__(self, maxsize=CACHE_SIZE, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = self.disk_hits = self.misses = 0
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('PRAGMA synchronous = OFF')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL)')
+
+    def split(self, household, exact=False, totals=None, period=None):
+        key = household_key(household, exact, period)
+        result = self.get(key)
+        if result is None:
+            result = split_household(household, exact, totals, period)
+            self.put(key, result)
+        return result
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            if self._conn is not None:
+                row = self._conn.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+                if row:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute('INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)',
+                                       (key, json.dumps(result, ensure_ascii=False)))
+
+    def load_encoded(self, keys):
+        found = {}
+        if self._conn is None:
+            return found
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                found.update(self._conn.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({','.join('?' * len(batch))})", batch))
+            self.disk_hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def store_encoded(self, items):
+        if self._conn is None or not items:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)', items)
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'size': len(self._results)}
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute('DELETE FROM results')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _remember(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+
+def line_key(line, exact=False):
+    # a household as one line of batch input; any change to it is a miss
+    prefix = 'exact\n' if exact else 'float\n'
+    return hashlib.sha256((prefix + line.strip()).encode('utf-8')).hexdigest()
+
+
+def household_key(household, exact=False, period=None):
+    # notes, deposits and ids of the household itself don't change the
+    # split and are left out; utility and tenant order do, and so does
+    # the period when tenants move in or out
+    tenants = household.get('tenants', [])
+    if period is None and is_prorated(tenants):
+        period = (household.get('year'), household.get('month'))
+    inputs = [
+        household.get('rent_amount', 0),
+        household.get('maintenance', 0),
+        household.get('split_type', 'equal'),
+        bool(exact),
+        [[name, u.get('amount', 0), u.get('split_method', 'Equal')]
+         for name, u in household.get('utilities', {}).items()],
+        [[t.get('id'), t.get('name'), t.get('room_size', 0), t.get('percentage', 0), t.get('usage'),
+          t.get('move_in'), t.get('move_out')]
+         for t in tenants]
+    ]
+    if period is not None:
+        inputs.append(list(period))
+    encoded = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
@@ -1,11 +1,184 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+import argparse
 import datetime
+import itertools
 import json
+import math
 import os
+import queue
+import sys
+import threading
+import time
+
+from rent_engine import make_tenant, make_utility, tenant_keys, SplitModel, SPLIT_TYPES, QUICK_UTILITIES
+from rent_import import import_tenants, import_utilities
+from rent_report import render_report, report_extension, FORMATS
+from rent_scenarios import ScenarioSweep, Scenario, scenario_grid, utility_subsets, parse_values
+from rent_storage import RentLog, Autosaver, LEGACY_DATA_FILE
+from rent_snapshot import SNAPSHOT_FILE, log_stamp, open_snapshot, write_snapshot
+from rent_cache import SplitCache
+from rent_db import RentDatabase
+from rent_ledger import PaymentLedger
+from rent_profile import phase, count
+import rent_profile
+
+# tkinter is only imported for the GUI so batch runs work on machines
+# without a display and don't pay for loading Tk
+tk = ttk = messagebox = scrolledtext = filedialog = None
+
+# calculations run on a worker thread; the UI checks its queue every
+# POLL_INTERVAL ms and it reports progress every PROGRESS_CHUNK tenants
+POLL_INTERVAL = 50
+PROGRESS_CHUNK = 5000
+
+# Treeviews read their row ids this many at a time, between idle
+# callbacks, so a long list doesn't hold up drawing the window
+LOAD_CHUNK = 20000
+
+def load_tk():
+    global tk, ttk, messagebox, scrolledtext, filedialog
+    import tkinter as tk
+    from tkinter import ttk, messagebox, scrolledtext, filedialog
+
+class VirtualTree:
+    # Keeps a ttk.Treeview down to the rows that fit on screen. The full
+    # list of row ids comes from row_ids() and each row's values from
+    # row_values(id); only the visible window is inserted as items and it
+    # is re-filled as the scrollbar or mouse wheel moves. Items use the
+    # row id as iid, and selection() remembers rows scrolled out of view.
+    # row_ids() may return any iterable; ids are taken LOAD_CHUNK at a
+    # time from after_idle callbacks, and the first window shows as soon
+    # as the first chunk is in.
+
+    def __init__(self, tree, scrollbar, row_ids, row_values):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_ids = row_ids
+        self.row_values = row_values
+        self.ids = []
+        self.pending = None
+        self.loading = None
+        self.first = 0
+        self.visible = int(tree.cget('height'))
+        self.selected = set()
+        self.rendered = {}
+        
+        scrollbar.configure(command=self.yview)
+        tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll(3))
+        tree.bind('<Configure>', self.on_resize)
+        tree.bind('<<TreeviewSelect>>', self.on_select)
+    
+    def refresh(self):
+        if self.loading is not None:
+            self.tree.after_cancel(self.loading)
+            self.loading = None
+        self.pending = iter(self.row_ids())
+        self.ids = []
+        # the first chunk covers the window on screen, wherever it's
+        # scrolled to
+        self.load_more(max(LOAD_CHUNK, self.first + self.visible))
+    
+    def load_more(self, size=LOAD_CHUNK):
+        self.loading = None
+        with phase('tree.load'):
+            try:
+                chunk = list(itertools.islice(self.pending, size))
+            except RuntimeError:
+                # the rows changed between chunks; start over
+                self.refresh()
+                return
+            self.ids.extend(chunk)
+            if len(chunk) == size:
+                self.loading = self.tree.after_idle(self.load_more)
+            else:
+                self.pending = None
+                if self.selected:
+                    self.selected &= set(self.ids)
+        self.render()
+    
+    def finish_loading(self):
+        while self.pending is not None:
+            if self.loading is not None:
+                self.tree.after_cancel(self.loading)
+            self.load_more()
+    
+    def render(self):
+        with phase('tree.render'):
+            self.first = max(0, min(self.first, len(self.ids) - self.visible))
+            window = self.ids[self.first:self.first + self.visible]
+            children = self.tree.get_children()
+            
+            if list(children) != window:
+                if children:
+                    self.tree.delete(*children)
+                self.rendered = {}
+                count('tree.rows_inserted', len(window))
+                for row_id in window:
+                    values = self.row_values(row_id)
+                    self.tree.insert('', 'end', iid=row_id, values=values)
+                    self.rendered[row_id] = values
+            else:
+                for row_id in window:
+                    values = self.row_values(row_id)
+                    if self.rendered.get(row_id) != values:
+                        self.tree.item(row_id, values=values)
+                        self.rendered[row_id] = values
+            
+            self.tree.selection_set([row_id for row_id in window if row_id in self.selected])
+            total = len(self.ids)
+            if total:
+                self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+    
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.ids))
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self.render()
+    
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+        return 'break'
+    
+    def see(self, row_id):
+        self.finish_loading()
+        index = self.ids.index(row_id)
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self.render()
+    
+    def selection(self):
+        return list(self.selected)
+    
+    def on_select(self, event=None):
+        window = self.tree.get_children()
+        self.selected.difference_update(window)
+        self.selected.update(self.tree.selection())
+    
+    def on_resize(self, event):
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if bbox:
+            visible = max(1, (event.height - bbox[1]) // bbox[3])
+            if visible != self.visible:
+                self.visible = visible
+                self.render()
 
 class RentCalculator:
-    def __init__(self, root):
+    # started is when the app started (time.perf_counter()), for the
+    # time to first paint; on_painted(seconds) is called once the window
+    # has been drawn
+    def __init__(self, root, started=None, on_painted=None):
+        self.started = time.perf_counter() if started is None else started
+        self.on_painted = on_painted
+        load_tk()
         self.root = root
         self.root.title("🏠  Rent Calculator")
         self.root.geometry("1200x800")
@@ -33,8 +206,36 @@ class RentCalculator:
             'maintenance': 0
         }
         
+        now = datetime.datetime.now()
+        self.period = (now.year, now.month)
+        self.data_lock = threading.Lock()
+        self.storage = RentLog()
+        self.snapshot = None
+        self.database = RentDatabase()
         self.load_data()
-        self.setup_ui()
+        self.model = SplitModel(self.rent_data)
+        self.tenant_rows = {}
+        self.split_cache = SplitCache()
+        self.calculation = None
+        self.autosaver = Autosaver(self.snapshot_data, self.write_snapshot, self.data_lock)
+        with phase('startup.ui'):
+            self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind('<Map>', self.on_map, add='+')
+    
+    def on_map(self, event):
+        # the first <Map> is the window going up; its contents are drawn
+        # by the idle callbacks queued ahead of this one
+        if event.widget is self.root:
+            self.root.unbind('<Map>')
+            self.root.after_idle(self.painted)
+    
+    def painted(self):
+        seconds = time.perf_counter() - self.started
+        if rent_profile.enabled():
+            rent_profile.record('startup.first_paint', seconds)
+        if self.on_painted:
+            self.on_painted(seconds)
     
     def setup_ui(self):
         main_frame = tk.Frame(self.root, bg=self.colors['background'])
@@ -49,15 +250,36 @@ class RentCalculator:
         header_label.pack(pady=15)
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
-        self.setup_basic_tab()
-        self.setup_tenants_tab()
-        self.setup_utilities_tab()
-        self.setup_results_tab()
-    
-    def setup_basic_tab(self):
-        basic_tab = tk.Frame(self.notebook, bg=self.colors['background'])
-        self.notebook.add(basic_tab, text="📋 Basic Information")
         
+        # shared by the Basic and Tenants tabs
+        self.split_var = tk.StringVar(value="equal")
+        self.tenants_view = self.utilities_view = None
+        
+        # only the first tab is built now; the others are built the first
+        # time they're selected, so startup doesn't grow with the data
+        self.tabs = []
+        for title, setup in (("📋 Basic Information", self.setup_basic_tab),
+                             ("👥 Tenants & Split", self.setup_tenants_tab),
+                             ("💡 Utilities", self.setup_utilities_tab),
+                             ("📊 Results & History", self.setup_results_tab)):
+            tab = tk.Frame(self.notebook, bg=self.colors['background'])
+            self.notebook.add(tab, text=title)
+            self.tabs.append([tab, setup])
+        self.notebook.bind('<<NotebookTabChanged>>',
+                           lambda e: self.build_tab(self.notebook.index('current')))
+        self.build_tab(0)
+    
+    def build_tab(self, index):
+        tab, setup = self.tabs[index]
+        if setup is not None:
+            self.tabs[index][1] = None
+            with phase('ui.build_tab'):
+                setup(tab)
+    
+    def tab_built(self, index):
+        return self.tabs[index][1] is None
+    
+    def setup_basic_tab(self, basic_tab):
         rent_card = self.create_card(basic_tab, "🏠 Rent Details")
         rent_card.pack(fill=tk.X, pady=10, padx=10)
         
@@ -93,32 +315,31 @@ class RentCalculator:
                  'July', 'August', 'September', 'October', 'November', 'December']
         self.month_combo = ttk.Combobox(period_content, values=months, state="readonly", width=15)
         self.month_combo.grid(row=0, column=1, padx=10, pady=10)
-        self.month_combo.current(datetime.datetime.now().month - 1)
+        self.month_combo.current(self.period[1] - 1)
+        self.month_combo.bind('<<ComboboxSelected>>', self.update_period)
         
         tk.Label(period_content, text="Year:", bg='white').grid(row=0, column=2, sticky=tk.W, padx=10, pady=10)
         current_year = datetime.datetime.now().year
         years = [str(current_year - 1), str(current_year), str(current_year + 1)]
+        if str(self.period[0]) not in years:
+            years.insert(0, str(self.period[0]))
         self.year_combo = ttk.Combobox(period_content, values=years, state="readonly", width=10)
         self.year_combo.grid(row=0, column=3, padx=10, pady=10)
-        self.year_combo.current(1)
+        self.year_combo.current(years.index(str(self.period[0])))
+        self.year_combo.bind('<<ComboboxSelected>>', self.update_period)
         
         calc_btn = tk.Button(basic_tab, text="💰 Calculate Rent", command=self.calculate_rent,
                             bg=self.colors['accent'], fg='white', font=('Helvetica', 12, 'bold'),
                             padx=30, pady=10)
         calc_btn.pack(pady=20)
     
-    def setup_tenants_tab(self):
-        tenants_tab = tk.Frame(self.notebook, bg=self.colors['background'])
-        self.notebook.add(tenants_tab, text="👥 Tenants & Split")
-        
+    def setup_tenants_tab(self, tenants_tab):
         split_card = self.create_card(tenants_tab, "⚖️ Split Type")
         split_card.pack(fill=tk.X, pady=10, padx=10)
         
         split_content = tk.Frame(split_card, bg='white')
         split_content.pack(pady=10, padx=10)
         
-        self.split_var = tk.StringVar(value="equal")
-        
         tk.Radiobutton(split_content, text="Equal Split", variable=self.split_var, 
                       value="equal", bg='white', command=self.update_split_type).grid(row=0, column=0, padx=20, pady=10)
         tk.Radiobutton(split_content, text="By Room Size", variable=self.split_var, 
@@ -136,8 +357,9 @@ class RentCalculator:
             self.tenants_tree.heading(col, text=col)
             self.tenants_tree.column(col, width=120)
         
-        scrollbar = ttk.Scrollbar(tenants_list_card, orient=tk.VERTICAL, command=self.tenants_tree.yview)
-        self.tenants_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(tenants_list_card, orient=tk.VERTICAL)
+        self.tenants_view = VirtualTree(self.tenants_tree, scrollbar,
+                                        lambda: self.model.tenants, self.tenant_row)
         
         self.tenants_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
@@ -157,6 +379,16 @@ class RentCalculator:
         self.percentage_entry = tk.Entry(controls_frame, width=10)
         self.percentage_entry.pack(side=tk.LEFT, padx=5)
         
+        # optional, YYYY-MM-DD; a tenant who moves in or out mid-month pays
+        # for the days they live there
+        tk.Label(controls_frame, text="Move In:", bg='white').pack(side=tk.LEFT, padx=5)
+        self.move_in_entry = tk.Entry(controls_frame, width=11)
+        self.move_in_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(controls_frame, text="Move Out:", bg='white').pack(side=tk.LEFT, padx=5)
+        self.move_out_entry = tk.Entry(controls_frame, width=11)
+        self.move_out_entry.pack(side=tk.LEFT, padx=5)
+        
         add_btn = tk.Button(controls_frame, text="➕ Add", command=self.add_tenant,
                            bg=self.colors['primary'], fg='white')
         add_btn.pack(side=tk.LEFT, padx=10)
@@ -165,12 +397,14 @@ class RentCalculator:
                            bg=self.colors['danger'], fg='white')
         del_btn.pack(side=tk.LEFT, padx=5)
         
+        import_btn = tk.Button(controls_frame, text="📥 Import CSV", command=self.import_tenants_csv,
+                              bg=self.colors['secondary'], fg='white')
+        import_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.update_split_type()
         self.load_tenants_to_tree()
     
-    def setup_utilities_tab(self):
-        utilities_tab = tk.Frame(self.notebook, bg=self.colors['background'])
-        self.notebook.add(utilities_tab, text="💡 Utilities")
-        
+    def setup_utilities_tab(self, utilities_tab):
         utilities_card = self.create_card(utilities_tab, "🔌 Utilities Breakdown")
         utilities_card.pack(fill=tk.BOTH, expand=True, pady=10, padx=10)
         
@@ -181,8 +415,9 @@ class RentCalculator:
             self.utilities_tree.heading(col, text=col)
             self.utilities_tree.column(col, width=120)
         
-        scrollbar = ttk.Scrollbar(utilities_card, orient=tk.VERTICAL, command=self.utilities_tree.yview)
-        self.utilities_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(utilities_card, orient=tk.VERTICAL)
+        self.utilities_view = VirtualTree(self.utilities_tree, scrollbar,
+                                          lambda: list(self.rent_data.get('utilities', {})), self.utility_row)
         
         self.utilities_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
@@ -205,6 +440,10 @@ class RentCalculator:
         self.util_split_combo.pack(side=tk.LEFT, padx=5)
         self.util_split_combo.current(0)
         
+        tk.Label(controls_frame, text="Readings:", bg='white').pack(side=tk.LEFT, padx=5)
+        self.util_readings_entry = tk.Entry(controls_frame, width=15)
+        self.util_readings_entry.pack(side=tk.LEFT, padx=5)
+        
         tk.Label(controls_frame, text="Notes:", bg='white').pack(side=tk.LEFT, padx=5)
         self.util_notes_entry = tk.Entry(controls_frame, width=20)
         self.util_notes_entry.pack(side=tk.LEFT, padx=5)
@@ -217,20 +456,16 @@ class RentCalculator:
                                 bg=self.colors['danger'], fg='white')
         del_util_btn.pack(side=tk.LEFT, padx=5)
         
+        import_util_btn = tk.Button(controls_frame, text="📥 Import CSV", command=self.import_utilities_csv,
+                                   bg=self.colors['secondary'], fg='white')
+        import_util_btn.pack(side=tk.LEFT, padx=5)
+        
         common_frame = tk.Frame(utilities_card, bg='white')
         common_frame.pack(fill=tk.X, pady=10, padx=10)
         
         tk.Label(common_frame, text="Quick Add:", bg='white', font=('Helvetica', 10, 'bold')).pack(side=tk.LEFT, padx=5)
         
-        common_utilities = [
-            ("⚡ Electricity", 1500),
-            ("💧 Water", 500),
-            ("🌐 Internet", 1000),
-            ("🗑️ Gas", 400),
-            ("📺 Cable TV", 300)
-        ]
-        
-        for util_name, util_amount in common_utilities:
+        for util_name, util_amount in QUICK_UTILITIES:
             btn = tk.Button(common_frame, text=f"{util_name} (₹{util_amount})", 
                            command=lambda n=util_name, a=util_amount: self.quick_add_utility(n, a),
                            bg=self.colors['light'])
@@ -238,10 +473,7 @@ class RentCalculator:
         
         self.load_utilities_to_tree()
     
-    def setup_results_tab(self):
-        results_tab = tk.Frame(self.notebook, bg=self.colors['background'])
-        self.notebook.add(results_tab, text="📊 Results & History")
-        
+    def setup_results_tab(self, results_tab):
         results_frame = tk.Frame(results_tab, bg=self.colors['card'], relief=tk.RAISED, bd=2)
         results_frame.pack(fill=tk.BOTH, expand=True, pady=10, padx=10)
         
@@ -250,6 +482,20 @@ class RentCalculator:
                                                      bg='white', fg=self.colors['dark'])
         self.results_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        progress_frame = tk.Frame(results_tab, bg=self.colors['background'])
+        progress_frame.pack(fill=tk.X, padx=10)
+        
+        self.progress = ttk.Progressbar(progress_frame, mode='determinate', maximum=100)
+        self.progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        self.progress_label = tk.Label(progress_frame, text="", width=24, anchor='w',
+                                       bg=self.colors['background'], fg=self.colors['dark'])
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_button = tk.Button(progress_frame, text="✖ Cancel", command=self.cancel_calculation,
+                                       bg=self.colors['warning'], fg='white', state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        
         button_frame = tk.Frame(results_tab, bg=self.colors['background'])
         button_frame.pack(fill=tk.X, pady=10, padx=10)
         
@@ -262,6 +508,12 @@ class RentCalculator:
         tk.Button(button_frame, text="📄 Generate Report", command=self.generate_report,
                  bg=self.colors['accent'], fg='white').pack(side=tk.LEFT, padx=5)
         
+        tk.Button(button_frame, text="💳 Payments", command=self.payments,
+                 bg=self.colors['success'], fg='white').pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(button_frame, text="🔮 What-If", command=self.what_if,
+                 bg=self.colors['secondary'], fg='white').pack(side=tk.LEFT, padx=5)
+        
         tk.Button(button_frame, text="🔄 Clear All", command=self.clear_all,
                  bg=self.colors['danger'], fg='white').pack(side=tk.LEFT, padx=5)
     
@@ -275,6 +527,8 @@ class RentCalculator:
         return card
     
     def update_split_type(self):
+        if not self.tab_built(1):
+            return
         split_type = self.split_var.get()
         if split_type == "equal":
             self.percentage_entry.config(state='disabled')
@@ -287,104 +541,113 @@ class RentCalculator:
             self.room_size_entry.config(state='disabled')
     
     def add_tenant(self):
-        name = self.tenant_name_entry.get().strip()
-        
-        if not name:
-            messagebox.showerror("Error", "Please enter tenant name!")
+        try:
+            tenant_data = make_tenant(self.tenant_name_entry.get(), self.room_size_entry.get(),
+                                      self.percentage_entry.get(), self.split_var.get(),
+                                      self.move_in_entry.get(), self.move_out_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        split_type = self.split_var.get()
-        
-        if split_type == "room":
-            try:
-                room_size = float(self.room_size_entry.get())
-                if room_size <= 0:
-                    raise ValueError
-            except:
-                messagebox.showerror("Error", "Please enter valid room size!")
-                return
-        
-        if split_type == "custom":
-            try:
-                percentage = float(self.percentage_entry.get())
-                if percentage <= 0 or percentage > 100:
-                    raise ValueError
-            except:
-                messagebox.showerror("Error", "Please enter valid percentage (0-100)!")
-                return
-        
-        tenant_data = {'name': name}
-        
-        if split_type == "room":
-            tenant_data['room_size'] = room_size
-            tenant_data['percentage'] = 0
-        elif split_type == "custom":
-            tenant_data['percentage'] = percentage
-            tenant_data['room_size'] = 0
-        else:  
-            tenant_data['percentage'] = 0
-            tenant_data['room_size'] = 0
-        
-        if split_type == "room":
-            self.tenants_tree.insert('', 'end', values=(name, room_size, 'Auto', '₹0'))
-        elif split_type == "custom":
-            self.tenants_tree.insert('', 'end', values=(name, 'N/A', f'{percentage}%', '₹0'))
-        else: 
-            self.tenants_tree.insert('', 'end', values=(name, 'N/A', 'Equal', '₹0'))
+        with self.data_lock:
+            tenant_id = self.model.add_tenant(tenant_data)
+        self.mark_dirty()
         
-        self.rent_data['tenants'].append(tenant_data)
+        self.tenants_view.refresh()
+        self.tenants_view.see(tenant_id)
         
         self.tenant_name_entry.delete(0, tk.END)
         self.room_size_entry.delete(0, tk.END)
         self.percentage_entry.delete(0, tk.END)
+        self.move_in_entry.delete(0, tk.END)
+        self.move_out_entry.delete(0, tk.END)
+    
+    def import_tenants_csv(self):
+        path = filedialog.askopenfilename(title="Import tenants",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            with phase('import.tenants'):
+                result = import_tenants(path, self.split_var.get())
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Failed to read {path}: {e}")
+            return
+        if result.error_count:
+            messagebox.showerror("Error", f"Nothing was imported, {result.error_count} row(s) have errors:\n\n"
+                                          + result.summary())
+            return
+        
+        with self.data_lock:
+            self.model.add_tenants(result.records)
+        self.mark_dirty()
+        self.tenants_view.refresh()
+        messagebox.showinfo("Success", f"Imported {len(result.records)} tenants")
     
     def remove_tenant(self):
-        selected = self.tenants_tree.selection()
+        selected = self.tenants_view.selection()
         if not selected:
             messagebox.showwarning("Warning", "Please select a tenant to remove!")
             return
         
         if messagebox.askyesno("Confirm", "Remove selected tenant?"):
+            with self.data_lock:
+                self.model.remove_tenants(selected)
             for item in selected:
-                values = self.tenants_tree.item(item)['values']
-                name = values[0]
-                
-                self.rent_data['tenants'] = [t for t in self.rent_data['tenants'] if t['name'] != name]
-                self.tenants_tree.delete(item)
+                self.tenant_rows.pop(item, None)
+            self.tenants_view.refresh()
+            self.mark_dirty()
     
     def add_utility(self):
-        name = self.util_name_entry.get().strip()
-        
-        if not name:
-            messagebox.showerror("Error", "Please enter utility name!")
-            return
-        
+        # By Usage needs one meter reading per tenant, in list order
         try:
-            amount = float(self.util_amount_entry.get())
-            if amount <= 0:
-                raise ValueError
-        except:
-            messagebox.showerror("Error", "Please enter valid amount!")
+            name, utility, readings = make_utility(
+                self.util_name_entry.get(), self.util_amount_entry.get(), self.util_split_combo.get(),
+                self.util_notes_entry.get(), self.util_readings_entry.get(), len(self.model))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        split_method = self.util_split_combo.get()
-        notes = self.util_notes_entry.get().strip()
     
-        self.utilities_tree.insert('', 'end', values=(name, f'₹{amount:,.2f}', split_method, notes))
-        
-        if 'utilities' not in self.rent_data:
-            self.rent_data['utilities'] = {}
-        
-        self.rent_data['utilities'][name] = {
-            'amount': amount,
-            'split_method': split_method,
-            'notes': notes
-        }
+        with self.data_lock:
+            self.model.set_utility(name, utility)
+            if readings:
+                self.model.set_usage(name, readings)
+        self.mark_dirty()
+        self.utilities_view.refresh()
+        self.utilities_view.see(name)
         
         self.util_name_entry.delete(0, tk.END)
         self.util_amount_entry.delete(0, tk.END)
+        self.util_readings_entry.delete(0, tk.END)
         self.util_notes_entry.delete(0, tk.END)
     
+    def import_utilities_csv(self):
+        path = filedialog.askopenfilename(title="Import utilities",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            with phase('import.utilities'):
+                result = import_utilities(path, len(self.model))
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Failed to read {path}: {e}")
+            return
+        if result.error_count:
+            messagebox.showerror("Error", f"Nothing was imported, {result.error_count} row(s) have errors:\n\n"
+                                          + result.summary())
+            return
+        
+        with self.data_lock:
+            for name, utility, readings in result.records:
+                self.model.set_utility(name, utility)
+                if readings:
+                    self.model.set_usage(name, readings)
+        self.mark_dirty()
+        self.utilities_view.refresh()
+        messagebox.showinfo("Success", f"Imported {len(result.records)} utilities")
+    
     def quick_add_utility(self, name, amount):
         self.util_name_entry.delete(0, tk.END)
         self.util_amount_entry.delete(0, tk.END)
@@ -395,140 +658,185 @@ class RentCalculator:
         self.add_utility()
     
     def remove_utility(self):
-        selected = self.utilities_tree.selection()
+        selected = self.utilities_view.selection()
         if not selected:
             messagebox.showwarning("Warning", "Please select a utility to remove!")
             return
         
         if messagebox.askyesno("Confirm", "Remove selected utility?"):
-            for item in selected:
-                values = self.utilities_tree.item(item)['values']
-                name = values[0]
-                
-                if name in self.rent_data.get('utilities', {}):
-                    del self.rent_data['utilities'][name]
-                
-                self.utilities_tree.delete(item)
+            with self.data_lock:
+                for name in selected:
+                    self.model.remove_utility(name)
+            self.utilities_view.refresh()
+            self.mark_dirty()
     
-    def calculate_rent(self):
+    def read_basic_info(self):
+        # rent, deposit and maintenance as typed; blank fields count as 0
         try:
-            rent_amount = float(self.rent_entry.get()) if self.rent_entry.get() else 0
-            security_deposit = float(self.deposit_entry.get()) if self.deposit_entry.get() else 0
-            maintenance = float(self.maintenance_entry.get()) if self.maintenance_entry.get() else 0
-            
-            if rent_amount <= 0:
-                messagebox.showerror("Error", "Please enter valid rent amount!")
+            return tuple(float(entry.get()) if entry.get() else 0
+                         for entry in (self.rent_entry, self.deposit_entry, self.maintenance_entry))
+        except ValueError:
+            raise ValueError("Please enter valid numbers in all fields!") from None
+    
+    def snapshot_household(self):
+        # a copy of the household that edits made meanwhile can't change,
+        # with the model's precomputed totals
+        with self.data_lock:
+            self.model.sync()
+            household = dict(self.rent_data)
+            household['tenants'] = [dict(t) for t in self.rent_data['tenants']]
+            household['utilities'] = {name: dict(u) for name, u in self.rent_data['utilities'].items()}
+            return household, self.model.totals(), self.period
+    
+    def calculate_rent(self):
+        with phase('calculate.parse'):
+            try:
+                rent_amount, security_deposit, maintenance = self.read_basic_info()
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
-            
+        
+        with self.data_lock:
             self.rent_data['rent_amount'] = rent_amount
             self.rent_data['security_deposit'] = security_deposit
             self.rent_data['maintenance'] = maintenance
             self.rent_data['split_type'] = self.split_var.get()
+        self.mark_dirty()
+        
+        # the worker gets its own copy of the household so edits made while
+        # it runs can't change the data under it
+        with phase('calculate.snapshot'):
+            household, totals, period = self.snapshot_household()
+        title = f"{self.month_combo.get()} {self.year_combo.get()}"
+        
+        # progress is shown on the Results tab
+        self.build_tab(3)
+        self.cancel_calculation()
+        results_queue = queue.Queue()
+        cancel = threading.Event()
+        worker = threading.Thread(target=self.run_calculation, name='calculation', daemon=True,
+                                  args=(household, totals, period, title, results_queue, cancel))
+        self.calculation = (worker, results_queue, cancel)
+        self.show_progress(0, "Calculating...")
+        self.cancel_button.config(state=tk.NORMAL)
+        worker.start()
+        self.root.after(POLL_INTERVAL, self.poll_calculation, results_queue)
+    
+    def run_calculation(self, household, totals, period, title, results_queue, cancel):
+        # runs on the worker thread: no Tk calls in here, everything goes
+        # back to the UI through results_queue
+        try:
+            with phase('calculate.compute'):
+                result = self.split_cache.split(household, totals=totals, period=period)
+            shares = result['shares']
+            split_type = result['split_type']
             
-            utilities_total = sum(util['amount'] for util in self.rent_data.get('utilities', {}).values())
-            
-            total_monthly = rent_amount + maintenance + utilities_total
-            split_type = self.split_var.get()
-            tenants = self.rent_data['tenants']
+            with phase('calculate.format'):
+                rows = {}
+                for start in range(0, len(shares), PROGRESS_CHUNK):
+                    if cancel.is_set():
+                        results_queue.put(('cancelled',))
+                        return
+                    for i in range(start, min(start + PROGRESS_CHUNK, len(shares))):
+                        tenant = shares[i]
+                        share = tenant['share']
+                        percentage = tenant['percentage']
+                        
+                        if split_type == "equal":
+                            row = (tenant['name'], 'N/A', 'Equal', f'₹{share:,.2f}')
+                        elif split_type == "room":
+                            row = (tenant['name'], f"{tenant['room_size']:,.0f} sq ft", f'{percentage:.1f}%', f'₹{share:,.2f}')
+                        else:
+                            row = (tenant['name'], 'N/A', f'{percentage:.1f}%', f'₹{share:,.2f}')
+                        if 'days' in tenant:
+                            row = row[:2] + (f"{percentage:.1f}% ({tenant['days']} days)",) + row[3:]
+                        
+                        rows[tenant['id']] = row
+                    results_queue.put(('progress', len(rows), len(shares)))
+                
+                text = render_report(household, result, title, kind='summary')
             
-            if not tenants:
-                messagebox.showerror("Error", "Please add at least one tenant!")
+            if cancel.is_set():
+                results_queue.put(('cancelled',))
                 return
             
-            results = []
-            results.append("=" * 60)
-            results.append(f"🏠 RENT CALCULATION FOR {self.month_combo.get().upper()} {self.year_combo.get()}")
-            results.append("=" * 60)
-            results.append("")
-            results.append(f"📋 BASIC INFORMATION")
-            results.append("-" * 40)
-            results.append(f"Monthly Rent:           ₹{rent_amount:,.2f}")
-            results.append(f"Maintenance:            ₹{maintenance:,.2f}")
-            results.append(f"Security Deposit:       ₹{security_deposit:,.2f}")
-            results.append("")
-            
-            if utilities_total > 0:
-                results.append(f"💡 UTILITIES BREAKDOWN (Total: ₹{utilities_total:,.2f})")
-                results.append("-" * 40)
-                for name, util in self.rent_data.get('utilities', {}).items():
-                    results.append(f"{name:20} ₹{util['amount']:,.2f}  ({util['split_method']})")
-                results.append("")
-            
-            results.append(f"💰 MONTHLY TOTAL: ₹{total_monthly:,.2f}")
-            results.append("")
-            
-            if split_type == "equal":
-                results.append(f"⚖️ SPLIT TYPE: Equal ({len(tenants)} tenants)")
-                results.append("-" * 40)
-                share_per_tenant = total_monthly / len(tenants)
-                for i, tenant in enumerate(tenants):
-                    results.append(f"{i+1}. {tenant['name']:15} ₹{share_per_tenant:,.2f}")
-                
-                    items = self.tenants_tree.get_children()
-                    if i < len(items):
-                        self.tenants_tree.item(items[i], values=(
-                            tenant['name'], 'N/A', 'Equal', f'₹{share_per_tenant:,.2f}'
-                        ))
-            
-            elif split_type == "room":
-                results.append(f"⚖️ SPLIT TYPE: By Room Size")
-                results.append("-" * 40)
-                
-                total_room_size = sum(t.get('room_size', 0) for t in tenants)
-                if total_room_size == 0:
-                    messagebox.showerror("Error", "Please add room sizes for all tenants!")
-                    return
-                
-                for i, tenant in enumerate(tenants):
-                    room_size = tenant.get('room_size', 0)
-                    percentage = (room_size / total_room_size) * 100
-                    share = total_monthly * (room_size / total_room_size)
-                    
-                    results.append(f"{i+1}. {tenant['name']:15} {room_size:,.0f} sq ft ({percentage:.1f}%) = ₹{share:,.2f}")
-                    
-                    items = self.tenants_tree.get_children()
-                    if i < len(items):
-                        self.tenants_tree.item(items[i], values=(
-                            tenant['name'], f'{room_size:,.0f} sq ft', f'{percentage:.1f}%', f'₹{share:,.2f}'
-                        ))
+            # sqlite connections belong to the thread that opened them
+            try:
+                with phase('calculate.save_db'):
+                    database = RentDatabase(self.database.path)
+                    ledger = PaymentLedger(self.database.path)
+                    try:
+                        database.save_period('default', *period, household, result)
+                        ledger.post_charges('default', *period, result)
+                    finally:
+                        database.close()
+                        ledger.close()
+            except Exception as e:
+                print(f"Error saving period: {e}")
             
-            elif split_type == "custom":
-                results.append(f"⚖️ SPLIT TYPE: Custom Percentage")
-                results.append("-" * 40)
-                
-                total_percentage = sum(t.get('percentage', 0) for t in tenants)
-                if abs(total_percentage - 100) > 0.1:
-                    messagebox.showerror("Error", f"Total percentage must be 100% (Current: {total_percentage:.1f}%)")
+            results_queue.put(('done', rows, text))
+        except ValueError as e:
+            results_queue.put(('error', str(e)))
+        except Exception as e:
+            results_queue.put(('error', f"Calculation failed: {e}"))
+    
+    def poll_calculation(self, results_queue):
+        if self.calculation is None or self.calculation[1] is not results_queue:
+            return  # cancelled or replaced by a newer calculation
+        
+        try:
+            while True:
+                message = results_queue.get_nowait()
+                kind = message[0]
+                if kind == 'progress':
+                    done, total = message[1:]
+                    self.show_progress(100 * done / total, f"Calculating... {done:,}/{total:,}")
+                else:
+                    self.finish_calculation(message)
                     return
-                
-                for i, tenant in enumerate(tenants):
-                    percentage = tenant.get('percentage', 0)
-                    share = total_monthly * (percentage / 100)
-                    
-                    results.append(f"{i+1}. {tenant['name']:15} {percentage:.1f}% = ₹{share:,.2f}")
-                    
-                    items = self.tenants_tree.get_children()
-                    if i < len(items):
-                        self.tenants_tree.item(items[i], values=(
-                            tenant['name'], 'N/A', f'{percentage:.1f}%', f'₹{share:,.2f}'
-                        ))
+        except queue.Empty:
+            self.root.after(POLL_INTERVAL, self.poll_calculation, results_queue)
+    
+    def finish_calculation(self, message):
+        self.calculation = None
+        self.cancel_button.config(state=tk.DISABLED)
+        kind = message[0]
+        if kind == 'error':
+            self.show_progress(0, "")
+            messagebox.showerror("Error", message[1])
+            return
+        if kind == 'cancelled':
+            self.show_progress(0, "Cancelled")
+            return
+        
+        count('calculate.runs')
+        with phase('calculate.widgets'):
+            rows, text = message[1:]
+            self.tenant_rows.update(rows)
+            self.show_progress(100, "Done")
             
-            results.append("")
-            results.append(f"🏦 SECURITY DEPOSIT PER TENANT: ₹{security_deposit/len(tenants):,.2f}")
-            results.append("")
-            results.append("💡 TIPS:")
-            results.append("- Split utilities equally or based on usage")
-            results.append("- Keep records of all payments")
-            results.append("- Set payment deadlines")
-            results.append("=" * 60)
+            # only the rows on screen are redrawn; the rest pick up their new
+            # values from tenant_rows when scrolled into view
+            self.load_tenants_to_tree()
             
             self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(1.0, '\n'.join(results))
-            
-            self.notebook.select(3)  
-            
-        except ValueError as e:
-            messagebox.showerror("Error", "Please enter valid numbers in all fields!")
+            self.results_text.insert(1.0, text)
+        
+        self.notebook.select(3)  
+    
+    def cancel_calculation(self):
+        if self.calculation is None:
+            return
+        worker, results_queue, cancel = self.calculation
+        cancel.set()
+        self.calculation = None
+        self.cancel_button.config(state=tk.DISABLED)
+        self.show_progress(0, "Cancelled")
+        return worker
+    
+    def show_progress(self, value, text):
+        self.progress['value'] = value
+        self.progress_label.config(text=text)
     
     def copy_to_clipboard(self):
         text = self.results_text.get(1.0, tk.END)
@@ -556,77 +864,21 @@ class RentCalculator:
             messagebox.showerror("Error", f"Failed to save: {str(e)}")
     
     def generate_report(self):
-        if not self.rent_data['tenants']:
+        if not len(self.model):
             messagebox.showwarning("Warning", "No data to generate report!")
             return
         
-        report = []
-        report.append("=" * 70)
-        report.append("📊 RENT PAYMENT REPORT")
-        report.append("=" * 70)
-        report.append("")
-        report.append(f"Period: {self.month_combo.get()} {self.year_combo.get()}")
-        report.append(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        report.append("")
-        report.append("📋 PAYMENT DETAILS")
-        report.append("-" * 70)
-        
-        total_rent = self.rent_data.get('rent_amount', 0)
-        total_maintenance = self.rent_data.get('maintenance', 0)
-        total_utilities = sum(util['amount'] for util in self.rent_data.get('utilities', {}).values())
-        total_monthly = total_rent + total_maintenance + total_utilities
-        
-        report.append(f"Monthly Rent:           ₹{total_rent:,.2f}")
-        report.append(f"Maintenance:            ₹{total_maintenance:,.2f}")
-        report.append(f"Utilities:              ₹{total_utilities:,.2f}")
-        report.append("-" * 70)
-        report.append(f"TOTAL MONTHLY:          ₹{total_monthly:,.2f}")
-        report.append("")
-        
-        report.append("👥 TENANT PAYMENT BREAKDOWN")
-        report.append("-" * 70)
-        
-        tenants = self.rent_data['tenants']
-        split_type = self.rent_data.get('split_type', 'equal')
-        
-        if split_type == "equal":
-            share_per_tenant = total_monthly / len(tenants)
-            for i, tenant in enumerate(tenants):
-                report.append(f"{i+1}. {tenant['name']:20} ₹{share_per_tenant:,.2f}")
+        with phase('report.compute'):
+            try:
+                result = self.model.split(cache=self.split_cache, period=self.period)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
         
-        elif split_type == "room":
-            total_room_size = sum(t.get('room_size', 0) for t in tenants)
-            for i, tenant in enumerate(tenants):
-                room_size = tenant.get('room_size', 0)
-                percentage = (room_size / total_room_size) * 100
-                share = total_monthly * (room_size / total_room_size)
-                report.append(f"{i+1}. {tenant['name']:20} {room_size:,.0f} sq ft ({percentage:.1f}%) = ₹{share:,.2f}")
-        
-        elif split_type == "custom":
-            for i, tenant in enumerate(tenants):
-                percentage = tenant.get('percentage', 0)
-                share = total_monthly * (percentage / 100)
-                report.append(f"{i+1}. {tenant['name']:20} {percentage:.1f}% = ₹{share:,.2f}")
-        
-        report.append("")
-        report.append("💡 UTILITIES DETAILS")
-        report.append("-" * 70)
-        
-        if self.rent_data.get('utilities'):
-            for name, util in self.rent_data['utilities'].items():
-                report.append(f"{name:25} ₹{util['amount']:,.2f} ({util['split_method']})")
-        else:
-            report.append("No utilities added")
-        
-        report.append("")
-        report.append("📋 PAYMENT INSTRUCTIONS")
-        report.append("-" * 70)
-        report.append("1. Please pay your share by the 5th of each month")
-        report.append("2. Use UPI, Bank Transfer, or Cash")
-        report.append("3. Keep transaction ID for reference")
-        report.append("4. Notify if payment will be delayed")
-        report.append("")
-        report.append("=" * 70)
+        period = f"{self.month_combo.get()} {self.year_combo.get()}"
+        with phase('report.format'):
+            report = render_report(self.rent_data, result, period)
+        count('report.runs')
         
         report_window = tk.Toplevel(self.root)
         report_window.title("Rent Payment Report")
@@ -634,19 +886,228 @@ class RentCalculator:
         
         text_widget = scrolledtext.ScrolledText(report_window, font=('Courier', 10))
         text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        text_widget.insert(1.0, '\n'.join(report))
+        text_widget.insert(1.0, report)
         text_widget.config(state='disabled')
        
-        save_btn = tk.Button(report_window, text="💾 Save Report", 
-                            command=lambda: self.save_report('\n'.join(report)),
+        button_frame = tk.Frame(report_window)
+        button_frame.pack(pady=10)
+        
+        save_btn = tk.Button(button_frame, text="💾 Save Report", 
+                            command=lambda: self.save_report(report),
                             bg=self.colors['accent'], fg='white')
-        save_btn.pack(pady=10)
+        save_btn.pack(side=tk.LEFT, padx=5)
+        
+        for fmt in ('csv', 'html'):
+            tk.Button(button_frame, text=f"💾 Save as {fmt.upper()}",
+                      command=lambda fmt=fmt: self.save_report(render_report(self.rent_data, result, period, fmt), fmt),
+                      bg=self.colors['primary'], fg='white').pack(side=tk.LEFT, padx=5)
+    
+    def payments(self):
+        # record payments against the shares charged by Calculate Rent and
+        # see who still owes what
+        with self.data_lock:
+            tenants = self.model.sync()
+            names = [t['name'] for t in tenants]
+            accounts = tenant_keys(tenants)
+        if not names:
+            messagebox.showwarning("Warning", "Add tenants before recording payments!")
+            return
+        
+        ledger = PaymentLedger(self.database.path)
+        window = tk.Toplevel(self.root)
+        window.title("Payments")
+        window.geometry("700x550")
+        window.bind('<Destroy>', lambda e: ledger.close() if e.widget is window else None)
+        
+        form = tk.Frame(window)
+        form.pack(fill=tk.X, padx=10, pady=10)
+        
+        tk.Label(form, text="Tenant:").grid(row=0, column=0, sticky='w', padx=5, pady=2)
+        tenant_combo = ttk.Combobox(form, values=names, state="readonly", width=20)
+        tenant_combo.current(0)
+        tenant_combo.grid(row=0, column=1, sticky='w', padx=5, pady=2)
+        
+        tk.Label(form, text="Amount (₹):").grid(row=0, column=2, sticky='w', padx=5, pady=2)
+        amount_entry = tk.Entry(form, width=12)
+        amount_entry.grid(row=0, column=3, sticky='w', padx=5, pady=2)
+        
+        tk.Label(form, text="Date:").grid(row=1, column=0, sticky='w', padx=5, pady=2)
+        date_entry = tk.Entry(form, width=12)
+        date_entry.insert(0, datetime.date.today().isoformat())
+        date_entry.grid(row=1, column=1, sticky='w', padx=5, pady=2)
+        
+        tk.Label(form, text="Transaction ID:").grid(row=1, column=2, sticky='w', padx=5, pady=2)
+        reference_entry = tk.Entry(form, width=20)
+        reference_entry.grid(row=1, column=3, sticky='w', padx=5, pady=2)
+        
+        summary = scrolledtext.ScrolledText(window, font=('Courier', 10))
+        
+        def show_balances():
+            today = datetime.date.today().isoformat()
+            lines = ["💳 BALANCES (this household)", "-" * 50]
+            balances = ledger.balances('default')
+            for name, account in zip(names, accounts):
+                lines.append(f"{name:20} ₹{balances.get(account, 0):,.2f}")
+            lines += ["", f"⚠️ IN ARREARS AS OF {today} (all households)", "-" * 50]
+            with phase('payments.arrears'):
+                arrears = ledger.arrears(today)
+            for row in arrears[:200]:
+                lines.append(f"{row['household'][:15]:15} {(row['name'] or row['tenant'])[:20]:20} ₹{row['balance']:,.2f}")
+            if len(arrears) > 200:
+                lines.append(f"... and {len(arrears) - 200:,} more")
+            if not arrears:
+                lines.append("Nobody is behind on payments")
+            summary.delete(1.0, tk.END)
+            summary.insert(1.0, '\n'.join(lines))
+        
+        def record():
+            try:
+                ledger.record_payment('default', accounts[tenant_combo.current()], amount_entry.get(),
+                                      date_entry.get().strip() or None, reference_entry.get().strip(),
+                                      *self.period)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e), parent=window)
+                return
+            amount_entry.delete(0, tk.END)
+            reference_entry.delete(0, tk.END)
+            show_balances()
+        
+        tk.Button(form, text="💾 Record Payment", command=record,
+                  bg=self.colors['success'], fg='white').grid(row=0, column=4, rowspan=2, padx=10)
+        summary.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        show_balances()
+    
+    def what_if(self):
+        # shares across a grid of rent changes, maintenance amounts, added
+        # Quick Add utilities and split types, all swept in one pass
+        if not len(self.model):
+            messagebox.showwarning("Warning", "Add tenants before trying scenarios!")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("What-If Scenarios")
+        window.geometry("900x650")
+        
+        controls = tk.Frame(window)
+        controls.pack(fill=tk.X, padx=10, pady=10)
+        
+        tk.Label(controls, text="Rent changes (%):").grid(row=0, column=0, sticky='w', padx=5, pady=2)
+        rent_changes = tk.Entry(controls, width=30)
+        rent_changes.insert(0, "0, 5, 10, 15")
+        rent_changes.grid(row=0, column=1, sticky='w', padx=5, pady=2)
+        
+        tk.Label(controls, text="Maintenance (₹):").grid(row=1, column=0, sticky='w', padx=5, pady=2)
+        maintenance = tk.Entry(controls, width=30)
+        maintenance.grid(row=1, column=1, sticky='w', padx=5, pady=2)
+        tk.Label(controls, text="blank keeps the current amount").grid(row=1, column=2, sticky='w', padx=5)
+        
+        tk.Label(controls, text="Try adding:").grid(row=2, column=0, sticky='w', padx=5, pady=2)
+        add_frame = tk.Frame(controls)
+        add_frame.grid(row=2, column=1, columnspan=2, sticky='w')
+        add_vars = {}
+        for name, amount in QUICK_UTILITIES:
+            add_vars[name] = tk.BooleanVar(value=False)
+            tk.Checkbutton(add_frame, text=f"{name} (₹{amount})", variable=add_vars[name]).pack(side=tk.LEFT)
+        
+        tk.Label(controls, text="Split types:").grid(row=3, column=0, sticky='w', padx=5, pady=2)
+        split_frame = tk.Frame(controls)
+        split_frame.grid(row=3, column=1, columnspan=2, sticky='w')
+        split_vars = {}
+        for split_type, text in zip(SPLIT_TYPES, ("Equal Split", "By Room Size", "Custom Percentage")):
+            split_vars[split_type] = tk.BooleanVar(value=split_type == self.split_var.get())
+            tk.Checkbutton(split_frame, text=text, variable=split_vars[split_type]).pack(side=tk.LEFT)
+        
+        run_frame = tk.Frame(window)
+        run_frame.pack(fill=tk.X, padx=10)
+        status = tk.Label(run_frame, text="", anchor='w')
+        
+        list_frame = tk.Frame(window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ('Scenario', 'Monthly Total', 'Lowest Share', 'Highest Share')
+        tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=12)
+        tree.column('Scenario', width=420)
+        for col in columns:
+            tree.heading(col, text=col)
+            if col != 'Scenario':
+                tree.column(col, width=130)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        details = scrolledtext.ScrolledText(window, height=8, font=('Courier', 10))
+        details.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        sweep = {'result': None, 'current': None}
+        
+        def row_ids():
+            result = sweep['result']
+            return [str(i) for i in range(len(result))] if result else []
+        
+        def row_values(row_id):
+            label, total, low, high = sweep['result'].row(int(row_id))
+            if low is None:
+                return (label, total, '', '')
+            return (label, f'₹{total:,.2f}', f'₹{low:,.2f}', f'₹{high:,.2f}')
+        
+        view = VirtualTree(tree, scrollbar, row_ids, row_values)
+        
+        def show_details(event=None):
+            selected = tree.selection()
+            if not selected or sweep['result'] is None:
+                return
+            result, i = sweep['result'], int(selected[0])
+            lines = [result.scenarios[i].label, '']
+            if i in result.errors:
+                lines.append(result.errors[i])
+            else:
+                current = sweep['current']
+                for name, share, before in zip(result.names, result.tenant_shares(i), current):
+                    change = '' if math.isnan(before) else f"  ({share - before:+,.2f})"
+                    lines.append(f"{name:20} ₹{share:,.2f}{change}")
+            details.delete(1.0, tk.END)
+            details.insert(1.0, '\n'.join(lines))
+        
+        tree.bind('<<TreeviewSelect>>', show_details, add='+')
+        
+        def run():
+            try:
+                rent_amount, _, current_maintenance = self.read_basic_info()
+                changes = parse_values(rent_changes.get(), "Please enter rent changes as numbers, e.g. 0, 5, 10")
+                amounts = parse_values(maintenance.get(), "Please enter maintenance amounts as numbers")
+            except ValueError as e:
+                messagebox.showerror("Error", str(e), parent=window)
+                return
+            household, totals, period = self.snapshot_household()
+            household['rent_amount'] = rent_amount
+            household['maintenance'] = current_maintenance
+            split_types = [t for t in SPLIT_TYPES if split_vars[t].get()] or [None]
+            added = [name for name, _ in QUICK_UTILITIES if add_vars[name].get()]
+            scenarios = scenario_grid(changes or [0], amounts or [None], utility_subsets(added), split_types)
+            
+            start = time.perf_counter()
+            with phase('whatif.sweep'):
+                model = ScenarioSweep(household, totals, period=period)
+                sweep['result'] = model.run(scenarios)
+                current = model.run([Scenario(0, None, (), None)])
+                sweep['current'] = current.tenant_shares(0)
+            elapsed = time.perf_counter() - start
+            count('whatif.scenarios', len(scenarios))
+            
+            view.first = 0
+            view.refresh()
+            status.config(text=f"{len(scenarios):,} scenarios in {elapsed * 1000:,.0f} ms "
+                               f"({len(sweep['result'].errors):,} can't be split)")
+        
+        tk.Button(run_frame, text="▶ Run Scenarios", command=run,
+                  bg=self.colors['primary'], fg='white').pack(side=tk.LEFT, padx=5)
+        status.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        run()
     
-    def save_report(self, report_text):
-        filename = f"rent_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    def save_report(self, report_text, fmt='text'):
+        filename = f"rent_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{report_extension(fmt)}"
         
         try:
-            with open(filename, 'w') as f:
+            with open(filename, 'w', encoding='utf-8') as f:
                 f.write(report_text)
             messagebox.showinfo("Success", f"Report saved to {filename}")
         except Exception as e:
@@ -657,66 +1118,230 @@ class RentCalculator:
             self.rent_entry.delete(0, tk.END)
             self.deposit_entry.delete(0, tk.END)
             self.maintenance_entry.delete(0, tk.END)
-            for item in self.tenants_tree.get_children():
-                self.tenants_tree.delete(item)
-            
-            for item in self.utilities_tree.get_children():
-                self.utilities_tree.delete(item)
-            
             self.results_text.delete(1.0, tk.END)
         
-            self.rent_data = {
-                'rent_amount': 0,
-                'utilities': {},
-                'tenants': [],
-                'split_type': 'equal',
-                'security_deposit': 0,
-                'maintenance': 0
-            }
-            
-            self.save_data()
+            with self.data_lock:
+                self.rent_data = {
+                    'rent_amount': 0,
+                    'utilities': {},
+                    'tenants': [],
+                    'split_type': 'equal',
+                    'security_deposit': 0,
+                    'maintenance': 0
+                }
+                self.model = SplitModel(self.rent_data)
+            self.mark_dirty()
+            self.tenant_rows.clear()
+            self.load_tenants_to_tree()
+            self.load_utilities_to_tree()
             
             messagebox.showinfo("Cleared", "All data has been cleared!")
     
     def load_tenants_to_tree(self):
-        for tenant in self.rent_data['tenants']:
-            name = tenant.get('name', '')
-            room_size = tenant.get('room_size', 0)
-            percentage = tenant.get('percentage', 0)
-            
-            if room_size > 0:
-                self.tenants_tree.insert('', 'end', values=(name, f'{room_size} sq ft', 'Auto', '₹0'))
-            elif percentage > 0:
-                self.tenants_tree.insert('', 'end', values=(name, 'N/A', f'{percentage}%', '₹0'))
-            else:
-                self.tenants_tree.insert('', 'end', values=(name, 'N/A', 'Equal', '₹0'))
+        # tabs not built yet are filled when they are
+        if self.tenants_view is not None:
+            self.tenants_view.refresh()
     
     def load_utilities_to_tree(self):
-        for name, util in self.rent_data.get('utilities', {}).items():
-            amount = util.get('amount', 0)
-            split_method = util.get('split_method', 'Equal')
-            notes = util.get('notes', '')
-            self.utilities_tree.insert('', 'end', values=(name, f'₹{amount:,.2f}', split_method, notes))
+        if self.utilities_view is not None:
+            self.utilities_view.refresh()
     
-    def save_data(self):
+    def tenant_row(self, tenant_id):
+        row = self.tenant_rows.get(tenant_id)
+        if row:
+            return row
+        
+        tenant = self.model.tenants[tenant_id]
+        name = tenant.get('name', '')
+        room_size = tenant.get('room_size', 0)
+        percentage = tenant.get('percentage', 0)
+        
+        if room_size > 0:
+            return (name, f'{room_size} sq ft', 'Auto', '₹0')
+        elif percentage > 0:
+            return (name, 'N/A', f'{percentage}%', '₹0')
+        else:
+            return (name, 'N/A', 'Equal', '₹0')
+    
+    def utility_row(self, name):
+        util = self.rent_data['utilities'][name]
+        amount = util.get('amount', 0)
+        split_method = util.get('split_method', 'Equal')
+        notes = util.get('notes', '')
+        return (name, f'₹{amount:,.2f}', split_method, notes)
+    
+    def update_period(self, event=None):
+        period = (int(self.year_combo.get()), self.month_combo.current() + 1)
+        
+        # switching to a period that was calculated before shows its data;
+        # a new period starts from what is on screen
         try:
-            with open('rent_calculator_data.json', 'w') as f:
-                json.dump(self.rent_data, f, indent=4)
+            with phase('load.period'):
+                saved = self.database.load_period('default', *period)
         except Exception as e:
-            print(f"Error saving data: {e}")
+            print(f"Error loading period: {e}")
+            saved = None
+        with self.data_lock:
+            self.period = period
+            if saved:
+                self.rent_data = saved
+                self.model = SplitModel(saved)
+        if saved:
+            self.mark_dirty()
+            self.refresh_from_data()
+    
+    def refresh_from_data(self):
+        for entry, key in ((self.rent_entry, 'rent_amount'), (self.deposit_entry, 'security_deposit'),
+                           (self.maintenance_entry, 'maintenance')):
+            entry.delete(0, tk.END)
+            if self.rent_data.get(key, 0) > 0:
+                entry.insert(0, str(self.rent_data[key]))
+        
+        self.split_var.set(self.rent_data.get('split_type', 'equal'))
+        self.update_split_type()
+        
+        self.tenant_rows.clear()
+        self.load_tenants_to_tree()
+        self.load_utilities_to_tree()
+        if self.tab_built(3):
+            self.results_text.delete(1.0, tk.END)
+    
+    def mark_dirty(self):
+        self.autosaver.mark()
+    
+    def snapshot_data(self):
+        # runs on the autosave thread with data_lock held
+        with phase('save.snapshot'):
+            year, month = self.period
+            self.model.sync()
+            return self.storage.encode(self.rent_data, year=year, month=month), year, month
+    
+    def write_snapshot(self, snapshot):
+        line, year, month = snapshot
+        with phase('save.write'):
+            self.storage.write(line, year=year, month=month)
+        count('save.bytes', len(line))
+    
+    def on_close(self):
+        worker = self.cancel_calculation()
+        if worker is not None:
+            worker.join()
+        self.autosaver.close()
+        self.database.close()
+        try:
+            if self.storage.needs_compaction():
+                self.storage.compact()
+        except Exception as e:
+            print(f"Error compacting data: {e}")
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            print(f"Error saving snapshot: {e}")
+        self.root.destroy()
+    
+    def save_snapshot(self):
+        # the binary snapshot of the log's latest state that the next
+        # start opens instead of parsing JSON; skipped while the one this
+        # session started from still matches the log
+        stamp = log_stamp(self.storage.path)
+        if stamp is None or (self.snapshot is not None and self.snapshot.source == stamp):
+            return
+        with phase('save.binary'):
+            with self.data_lock:
+                self.model.sync()
+            if self.snapshot is not None:
+                # every tenant was read by sync(); the file can go
+                self.snapshot.close()
+                self.snapshot = None
+            write_snapshot(SNAPSHOT_FILE, self.rent_data, *self.period, source=stamp)
     
     def load_data(self):
         try:
-            if os.path.exists('rent_calculator_data.json'):
-                with open('rent_calculator_data.json', 'r') as f:
-                    self.rent_data = json.load(f)
+            with phase('load.read'):
+                if not os.path.exists(self.storage.path) and os.path.exists(LEGACY_DATA_FILE):
+                    self.storage.import_json(LEGACY_DATA_FILE)
+                stamp = log_stamp(self.storage.path)
+                self.snapshot = open_snapshot(SNAPSHOT_FILE, stamp) if stamp else None
+                record = None if self.snapshot else self.storage.last()
+            if self.snapshot:
+                self.rent_data = self.snapshot.household()
+                if all(self.snapshot.period):
+                    self.period = self.snapshot.period
+            elif record:
+                self.rent_data = record['data']
+                if record.get('year') and record.get('month'):
+                    self.period = (record['year'], record['month'])
         except Exception as e:
             print(f"Error loading data: {e}")
 
-def main():
+def main(argv=None):
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Rent calculator for shared housing")
+    parser.add_argument('--batch', metavar='INPUT',
+                        help="split households from a JSONL file ('-' for stdin) without starting the GUI")
+    parser.add_argument('--out', metavar='OUTPUT', default='-',
+                        help="where to write batch results as JSONL (default: stdout)")
+    parser.add_argument('--exact', action='store_true',
+                        help="compute batch shares in integer paise that add up to the total")
+    parser.add_argument('--db', metavar='DATABASE',
+                        help="also store batch households and shares in this SQLite database, "
+                             "keyed by each household's id, year and month")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"split batch households in this many processes (0: one per CPU, {os.cpu_count() or 1} here)")
+    parser.add_argument('--chunk-size', type=int,
+                        help="households per task sent to a worker process (default: 500)")
+    parser.add_argument('--cache', metavar='CACHE',
+                        help="reuse batch splits of unchanged households from this cache file")
+    parser.add_argument('--reports', metavar='REPORTS',
+                        help="also write every household's payment report to this file")
+    parser.add_argument('--report-format', choices=FORMATS, default='text',
+                        help="format of the --reports file (default: text)")
+    parser.add_argument('--profile', metavar='SUMMARY',
+                        help=f"time calculate/report/save phases and write a JSON summary here on exit "
+                             f"('-' for stderr; also ${rent_profile.PROFILE_ENV})")
+    parser.add_argument('--cprofile', metavar='STATS',
+                        help=f"with --profile, also save cProfile stats of the main thread here "
+                             f"(also ${rent_profile.CPROFILE_ENV})")
+    # the server's defaults are filled in once it's imported, which only
+    # --serve pays for
+    parser.add_argument('--serve', metavar='PORT', nargs='?', type=int, const=0,
+                        help="serve splits and reports over HTTP/JSON instead of starting the GUI "
+                             "(default port: 8765)")
+    parser.add_argument('--host',
+                        help="address for --serve to listen on (default: 127.0.0.1)")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="start the GUI, print the time to first paint as JSON and close it again")
+    args = parser.parse_args(argv)
+    
+    if args.profile:
+        rent_profile.enable(args.profile, args.cprofile)
+    else:
+        rent_profile.enable_from_env()
+    
+    if args.batch:
+        # the process pool is only loaded for batch runs
+        from rent_portfolio import run_portfolio, CHUNK_SIZE
+        chunk_size = CHUNK_SIZE if args.chunk_size is None else args.chunk_size
+        done, failed, cached = run_portfolio(args.batch, args.out, args.workers, chunk_size,
+                                             args.exact, args.db, args.reports, args.report_format,
+                                             args.cache)
+        print(f"Processed {done} households ({failed} failed, {cached} from cache)", file=sys.stderr)
+        return 1 if failed else 0
+    
+    if args.serve is not None:
+        from rent_server import serve, HOST, PORT
+        serve(args.host or HOST, args.serve or PORT)
+        return 0
+    
+    load_tk()
     root = tk.Tk()
-    app = RentCalculator(root)
+    def print_first_paint(seconds):
+        print(json.dumps({'first_paint_s': round(seconds, 4)}))
+        root.after_idle(app.on_close)
+    on_painted = print_first_paint if args.startup_time else None
+    app = RentCalculator(root, started, on_painted)
     root.mainloop()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
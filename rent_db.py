@@ -0,0 +1,204 @@
+import json
+import sqlite3
+
+from rent_engine import tenant_keys
+
+DB_FILE = 'rent_calculator.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS households (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS periods (
+    id INTEGER PRIMARY KEY,
+    household_id INTEGER NOT NULL REFERENCES households(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    rent_amount REAL NOT NULL DEFAULT 0,
+    maintenance REAL NOT NULL DEFAULT 0,
+    security_deposit REAL NOT NULL DEFAULT 0,
+    split_type TEXT NOT NULL DEFAULT 'equal',
+    total_monthly REAL,
+    UNIQUE (household_id, year, month)
+);
+CREATE TABLE IF NOT EXISTS tenants (
+    period_id INTEGER NOT NULL REFERENCES periods(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    room_size REAL NOT NULL DEFAULT 0,
+    percentage REAL NOT NULL DEFAULT 0,
+    usage TEXT NOT NULL DEFAULT '{}',
+    tenant_id TEXT,
+    move_in TEXT,
+    move_out TEXT,
+    PRIMARY KEY (period_id, position)
+);
+CREATE TABLE IF NOT EXISTS utilities (
+    period_id INTEGER NOT NULL REFERENCES periods(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    amount REAL NOT NULL,
+    split_method TEXT NOT NULL DEFAULT 'Equal',
+    notes TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (period_id, name)
+);
+CREATE TABLE IF NOT EXISTS shares (
+    period_id INTEGER NOT NULL REFERENCES periods(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tenant_name TEXT NOT NULL,
+    percentage REAL NOT NULL,
+    share REAL NOT NULL,
+    tenant_id TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (period_id, position)
+);
+'''
+
+# created once the columns it covers are there (see _migrate())
+INDEXES = '''
+DROP INDEX IF EXISTS shares_by_tenant;
+CREATE INDEX IF NOT EXISTS shares_by_tenant_id ON shares (tenant_id, period_id);
+'''
+
+
+class RentDatabase:
+    # Many households, one row per (household, year, month) period. The
+    # UNIQUE constraint on periods doubles as the (household, year, month)
+    # index and shares_by_tenant_id serves payment history lookups. Shares
+    # are kept by tenant id (see rent_engine.tenant_keys()), so tenants
+    # who share a name have separate histories.
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # columns added after the first release of the schema
+        added = (
+            ('usage', "TEXT NOT NULL DEFAULT '{}'"),
+            ('tenant_id', 'TEXT'),
+            ('move_in', 'TEXT'),
+            ('move_out', 'TEXT')
+        )
+        columns = [row['name'] for row in self.conn.execute('PRAGMA table_info(tenants)')]
+        with self.conn:
+            for column, definition in added:
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE tenants ADD COLUMN {column} {definition}')
+            columns = [row['name'] for row in self.conn.execute('PRAGMA table_info(shares)')]
+            if 'tenant_id' not in columns:
+                # older shares take their tenant's stored id, or the name
+                self.conn.execute("ALTER TABLE shares ADD COLUMN tenant_id TEXT NOT NULL DEFAULT ''")
+                self.conn.execute(
+                    'UPDATE shares SET tenant_id = coalesce(nullif((SELECT t.tenant_id FROM tenants t '
+                    'WHERE t.period_id = shares.period_id AND t.position = shares.position), \'\'), tenant_name)')
+        self.conn.executescript(INDEXES)
+
+    def close(self):
+        self.conn.close()
+
+    def household_id(self, name):
+        self.conn.execute('INSERT OR IGNORE INTO households (name) VALUES (?)', (name,))
+        return self.conn.execute('SELECT id FROM households WHERE name = ?', (name,)).fetchone()[0]
+
+    def save_period(self, household, year, month, rent_data, result=None):
+        # replaces whatever was stored for that period; result is a
+        # split_household() result whose shares are stored alongside
+        with self.conn:
+            self._save_period(household, year, month, rent_data, result)
+
+    def save_periods(self, rows):
+        # bulk variant: (household, year, month, rent_data, result) tuples
+        # in a single transaction
+        with self.conn:
+            for row in rows:
+                self._save_period(*row)
+
+    def _save_period(self, household, year, month, rent_data, result=None):
+        household_id = self.household_id(household)
+        self.conn.execute('DELETE FROM periods WHERE household_id = ? AND year = ? AND month = ?',
+                          (household_id, year, month))
+        period_id = self.conn.execute(
+            'INSERT INTO periods (household_id, year, month, rent_amount, maintenance, '
+            'security_deposit, split_type, total_monthly) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (household_id, year, month, rent_data.get('rent_amount', 0), rent_data.get('maintenance', 0),
+             rent_data.get('security_deposit', 0), rent_data.get('split_type', 'equal'),
+             result['total_monthly'] if result else None)).lastrowid
+
+        self.conn.executemany(
+            'INSERT INTO tenants (period_id, position, name, room_size, percentage, usage, tenant_id, '
+            'move_in, move_out) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(period_id, i, t['name'], t.get('room_size', 0), t.get('percentage', 0),
+              json.dumps(t.get('usage', {}), ensure_ascii=False), t.get('id'),
+              t.get('move_in') or None, t.get('move_out') or None)
+             for i, t in enumerate(rent_data.get('tenants', []))])
+        self.conn.executemany(
+            'INSERT INTO utilities (period_id, name, amount, split_method, notes) VALUES (?, ?, ?, ?, ?)',
+            [(period_id, name, u['amount'], u.get('split_method', 'Equal'), u.get('notes', ''))
+             for name, u in rent_data.get('utilities', {}).items()])
+        if result:
+            self.conn.executemany(
+                'INSERT INTO shares (period_id, position, tenant_id, tenant_name, percentage, share) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(period_id, i, key, t['name'], t['percentage'], t['share'])
+                 for i, (key, t) in enumerate(zip(tenant_keys(result['shares']), result['shares']))])
+        return period_id
+
+    def load_period(self, household, year, month):
+        period = self.conn.execute(
+            'SELECT p.* FROM periods p JOIN households h ON h.id = p.household_id '
+            'WHERE h.name = ? AND p.year = ? AND p.month = ?', (household, year, month)).fetchone()
+        if period is None:
+            return None
+
+        tenants = self.conn.execute(
+            'SELECT name, room_size, percentage, usage, tenant_id, move_in, move_out FROM tenants '
+            'WHERE period_id = ? ORDER BY position',
+            (period['id'],))
+        utilities = self.conn.execute(
+            'SELECT name, amount, split_method, notes FROM utilities WHERE period_id = ? ORDER BY rowid',
+            (period['id'],))
+        return {
+            'rent_amount': period['rent_amount'],
+            'utilities': {u['name']: {'amount': u['amount'], 'split_method': u['split_method'],
+                                      'notes': u['notes']} for u in utilities},
+            'tenants': [_tenant(t) for t in tenants],
+            'split_type': period['split_type'],
+            'security_deposit': period['security_deposit'],
+            'maintenance': period['maintenance']
+        }
+
+    def periods(self, household):
+        return [(row['year'], row['month']) for row in self.conn.execute(
+            'SELECT p.year, p.month FROM periods p JOIN households h ON h.id = p.household_id '
+            'WHERE h.name = ? ORDER BY p.year, p.month', (household,))]
+
+    def tenant_history(self, tenant_id, months=24, household=None):
+        # name is the tenant's name as it was that month
+        query = ('SELECT h.name AS household, p.year, p.month, s.tenant_name AS name, s.percentage, s.share '
+                 'FROM shares s JOIN periods p ON p.id = s.period_id '
+                 'JOIN households h ON h.id = p.household_id WHERE s.tenant_id = ?')
+        params = [tenant_id]
+        if household is not None:
+            query += ' AND h.name = ?'
+            params.append(household)
+        query += ' ORDER BY p.year DESC, p.month DESC LIMIT ?'
+        params.append(months)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+
+def _tenant(row):
+    tenant = {'name': row['name'], 'room_size': row['room_size'], 'percentage': row['percentage']}
+    if row['tenant_id']:
+        tenant['id'] = row['tenant_id']
+    for key in ('move_in', 'move_out'):
+        if row[key]:
+            tenant[key] = row[key]
+    usage = json.loads(row['usage'])
+    if usage:
+        tenant['usage'] = usage
+    return tenant
@@ -0,0 +1,783 @@
+import calendar
+import datetime
+import math
+import numbers
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+# numpy is optional and only loaded by the portfolio path; importing it
+# costs more than the rest of a small batch run
+np = None
+
+SPLIT_TYPES = ('equal', 'room', 'custom')
+UTILITY_SPLIT_METHODS = ('Equal', 'By Usage', 'Custom')
+
+# the Utilities tab's Quick Add presets, (name, monthly amount)
+QUICK_UTILITIES = (
+    ("⚡ Electricity", 1500),
+    ("💧 Water", 500),
+    ("🌐 Internet", 1000),
+    ("🗑️ Gas", 400),
+    ("📺 Cable TV", 300)
+)
+
+# custom percentages may be off by this much before we refuse to split
+PERCENTAGE_TOLERANCE = 0.1
+
+# shares are turned into integer weights at this resolution for exact
+# (paise) splits
+WEIGHT_SCALE = 10_000
+
+
+def to_paise(amount):
+    return int(Decimal(str(amount)).scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+def largest_remainder(total, weights):
+    # split an integer total in proportion to integer weights so that the
+    # parts add back up to total exactly; leftover units go to the largest
+    # remainders, earlier tenants first on ties
+    weight_sum = sum(weights)
+    parts = []
+    remainders = []
+    for i, weight in enumerate(weights):
+        part, remainder = divmod(total * weight, weight_sum)
+        parts.append(part)
+        remainders.append((-remainder, i))
+    for _, i in sorted(remainders)[:total - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def utilities_total(household):
+    return sum(util['amount'] for util in household.get('utilities', {}).values())
+
+
+def monthly_total(household):
+    return (household.get('rent_amount', 0) + household.get('maintenance', 0)
+            + utilities_total(household))
+
+
+def make_tenant(name, room_size, percentage, split_type, move_in='', move_out=''):
+    # the checks add_tenant applies to what was typed in (strings); only
+    # the value the split type uses is kept, the other one is zeroed.
+    # Move-in and move-out dates are optional.
+    name = (name or '').strip()
+    if not name:
+        raise ValueError("Please enter tenant name!")
+
+    tenant = {'name': name, 'room_size': 0, 'percentage': 0}
+    if split_type == "room":
+        tenant['room_size'] = _number(room_size, "Please enter valid room size!", 0, None)
+    elif split_type == "custom":
+        tenant['percentage'] = _number(percentage, "Please enter valid percentage (0-100)!", 0, 100)
+
+    start, end = parse_date((move_in or '').strip()), parse_date((move_out or '').strip())
+    if start and end and end < start:
+        raise ValueError(f"{name} moves out before moving in!")
+    if start:
+        tenant['move_in'] = start.isoformat()
+    if end:
+        tenant['move_out'] = end.isoformat()
+    return tenant
+
+
+def make_utility(name, amount, split_method, notes='', readings=None, tenant_count=0):
+    # the checks add_utility applies; readings is the comma separated
+    # meter readings, one per tenant, that 'By Usage' needs
+    name = (name or '').strip()
+    if not name:
+        raise ValueError("Please enter utility name!")
+    amount = _number(amount, "Please enter valid amount!", 0, None)
+    split_method = (split_method or 'Equal').strip()
+    if split_method not in UTILITY_SPLIT_METHODS:
+        raise ValueError(f"Unknown split method: {split_method}")
+
+    usage = None
+    if split_method == 'By Usage':
+        message = "Please enter one meter reading per tenant, separated by commas!"
+        try:
+            usage = [float(r) for r in (readings or '').split(',')]
+        except ValueError:
+            raise ValueError(message) from None
+        if (len(usage) != tenant_count or not all(map(math.isfinite, usage))
+                or min(usage) < 0 or sum(usage) <= 0):
+            raise ValueError(message)
+
+    utility = {'amount': amount, 'split_method': split_method, 'notes': (notes or '').strip()}
+    return name, utility, usage
+
+
+def _number(text, message, low, high):
+    # low is exclusive, high inclusive (None for no limit)
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+    if not math.isfinite(value) or value <= low or (high is not None and value > high):
+        raise ValueError(message)
+    return value
+
+
+def _finite(value):
+    # math.isfinite, but an int too big for a float is not finite either
+    # rather than an OverflowError
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def split_household(household, exact=False, totals=None, period=None):
+    # totals, when given, are the household's precomputed (utilities total,
+    # total room size, total percentage), e.g. from a SplitModel. Tenants
+    # with move_in/move_out dates are prorated by the days they occupy the
+    # flat in period, (year, month), by default the household's own year
+    # and month.
+    rent_amount = household.get('rent_amount', 0)
+    if rent_amount <= 0 or not _finite(rent_amount):
+        raise ValueError("Please enter valid rent amount!")
+
+    tenants = household.get('tenants', [])
+    if not tenants:
+        raise ValueError("Please add at least one tenant!")
+
+    try:
+        util_total = totals[0] if totals else utilities_total(household)
+        base_total = rent_amount + household.get('maintenance', 0)
+        total_monthly = base_total + util_total
+    except OverflowError:
+        total_monthly = math.nan
+    if not _finite(total_monthly):
+        raise ValueError("Please enter valid maintenance and utility amounts!")
+    split_type = household.get('split_type', 'equal')
+    fractions = split_fractions(tenants, split_type, totals)
+
+    days = None
+    if is_prorated(tenants):
+        days = occupied_days(tenants, *(period or household_period(household)))
+        fractions = prorate(fractions, days)
+
+    # each utility follows its own split method
+    utility_names, allocation = allocate_utilities(household, fractions, days)
+
+    shares = []
+    for tenant, fraction, row in zip(tenants, fractions, allocation):
+        shares.append({
+            'id': tenant.get('id'),
+            'name': tenant['name'],
+            'room_size': tenant.get('room_size', 0),
+            'percentage': fraction * 100,
+            'share': base_total * fraction + sum(row)
+        })
+
+    if days is not None:
+        for tenant, occupied in zip(shares, days):
+            tenant['days'] = occupied
+
+    result = {
+        'split_type': split_type,
+        'utilities_total': util_total,
+        'total_monthly': total_monthly,
+        'shares': shares,
+        'utility_names': utility_names,
+        'allocation': allocation
+    }
+    if exact:
+        _apply_paise(result)
+    return result
+
+
+def split_fractions(tenants, split_type, totals=None):
+    # each tenant's fraction of rent and maintenance under split_type
+    if split_type == "equal":
+        return [1 / len(tenants)] * len(tenants)
+
+    if split_type == "room":
+        total_room_size = totals[1] if totals else sum(t.get('room_size', 0) for t in tenants)
+        if total_room_size == 0:
+            raise ValueError("Please add room sizes for all tenants!")
+        return [t.get('room_size', 0) / total_room_size for t in tenants]
+
+    if split_type == "custom":
+        total_percentage = totals[2] if totals else sum(t.get('percentage', 0) for t in tenants)
+        if abs(total_percentage - 100) > PERCENTAGE_TOLERANCE:
+            raise ValueError(f"Total percentage must be 100% (Current: {total_percentage:.1f}%)")
+        return [t.get('percentage', 0) / 100 for t in tenants]
+
+    raise ValueError(f"Unknown split type: {split_type}")
+
+
+def is_prorated(tenants):
+    return any(t.get('move_in') or t.get('move_out') for t in tenants)
+
+
+def household_period(household):
+    year, month = household.get('year'), household.get('month')
+    if year is None or month is None:
+        raise ValueError("Move-in and move-out dates need the period's year and month!")
+    return year, month
+
+
+def occupied_days(tenants, year, month):
+    # days of the month each tenant lives in the flat; move_in and
+    # move_out are ISO dates (both days count) and either may be missing
+    first = datetime.date(year, month, 1)
+    last = datetime.date(year, month, calendar.monthrange(year, month)[1])
+    days = []
+    for t in tenants:
+        start, end = parse_date(t.get('move_in')), parse_date(t.get('move_out'))
+        if start and end and end < start:
+            raise ValueError(f"{t['name']} moves out before moving in!")
+        start = max(start, first) if start else first
+        end = min(end, last) if end else last
+        days.append(max(0, (end - start).days + 1))
+    if not any(days):
+        raise ValueError(f"Nobody lives in the flat in {calendar.month_name[month]} {year}!")
+    return days
+
+
+def prorate(fractions, days):
+    # fractions weighted by days in the flat, scaled back up to 1
+    weighted = [f * d for f, d in zip(fractions, days)]
+    weight_sum = sum(weighted)
+    if weight_sum <= 0:
+        raise ValueError("Nobody with a share of the rent lives in the flat that month!")
+    return [w / weight_sum for w in weighted]
+
+
+def parse_date(text):
+    # ISO date (YYYY-MM-DD) or blank
+    if not text:
+        return None
+    try:
+        return datetime.date.fromisoformat(text)
+    except (TypeError, ValueError):
+        raise ValueError("Please enter dates as YYYY-MM-DD!") from None
+
+
+def allocate_utilities(household, fractions, days=None):
+    # per-tenant x per-utility matrix (rows are tenants, columns follow
+    # utility_names): 'Equal' utilities are split evenly (by days in the
+    # flat when prorated), 'By Usage' ones by each tenant's meter reading
+    # in tenant['usage'][utility name] and 'Custom' ones by the
+    # household's rent fractions
+    tenants = household.get('tenants', [])
+    utilities = household.get('utilities', {})
+    utility_names = list(utilities)
+    allocation = [[0.0] * len(utility_names) for _ in tenants]
+
+    for j, name in enumerate(utility_names):
+        weights = utility_weights(name, utilities[name], tenants, fractions, days)
+        weight_sum = sum(weights)
+        amount = utilities[name]['amount']
+        for row, weight in zip(allocation, weights):
+            row[j] = amount * weight / weight_sum
+    return utility_names, allocation
+
+
+def utility_weights(name, utility, tenants, fractions, days=None):
+    method = utility.get('split_method', 'Equal')
+    if method == 'By Usage':
+        weights = [t.get('usage', {}).get(name, 0) for t in tenants]
+        if sum(weights) <= 0:
+            raise ValueError(f"Please enter meter readings for {name}!")
+        return weights
+    if method == 'Custom':
+        return fractions
+    return days or [1] * len(tenants)
+
+
+def tenant_keys(shares):
+    # the key each tenant's ledger account and share history are kept
+    # under: the tenant's id, or for tenants without one (e.g. batch
+    # input) their name, numbered from the second tenant of that name on
+    keys, seen = [], {}
+    for share in shares:
+        key = share.get('id')
+        if not key:
+            name = share['name']
+            seen[name] = seen.get(name, 0) + 1
+            key = name if seen[name] == 1 else f"{name} #{seen[name]}"
+        keys.append(key)
+    return keys
+
+
+def exact_paise(result):
+    # each tenant's share in paise, adding up to the monthly total: those
+    # of an exact=True result, or worked out the same way from a float one
+    shares = result['shares']
+    if all('share_paise' in t for t in shares):
+        return [t['share_paise'] for t in shares]
+    return _paise(result)
+
+
+def _paise(result):
+    # shares are already exact in rupees up to float error, so they double
+    # as the integer weights the paise are distributed by
+    weights = [round(t['share'] * WEIGHT_SCALE) for t in result['shares']]
+    return largest_remainder(to_paise(result['total_monthly']), weights)
+
+
+def _apply_paise(result):
+    result['total_paise'] = to_paise(result['total_monthly'])
+    for tenant, paise in zip(result['shares'], _paise(result)):
+        tenant['share_paise'] = paise
+        tenant['share'] = paise / 100
+
+
+class SplitModel:
+    # Keeps the utilities total, total room size and total percentage of
+    # one household up to date as tenants and utilities are added and
+    # removed, so a split after an edit doesn't re-sum every record.
+    # Tenants are indexed by a stable id (tenant['id']), which makes
+    # adding, updating and removing one O(1); the household's tenant list
+    # is rebuilt lazily by sync() after removals.
+
+    def __init__(self, household):
+        self.household = household
+        household.setdefault('tenants', [])
+        household.setdefault('utilities', {})
+        by_id = getattr(household['tenants'], 'by_id', None)
+        index = by_id() if by_id else None
+        if index is not None:
+            # a rent_snapshot household: ids and totals were saved with
+            # it, so tenants are only read from the file when used; the
+            # tenant list is rebuilt by sync()
+            self.tenants = index
+            self._synced = False
+            self.utilities_total = utilities_total(household)
+            self.total_room_size, self.total_percentage = household['tenants'].totals
+            return
+        if not isinstance(household['tenants'], list):
+            household['tenants'] = list(household['tenants'])
+        self.tenants = {}
+        for tenant in household['tenants']:
+            if not tenant.get('id') or tenant['id'] in self.tenants:
+                tenant['id'] = new_tenant_id()
+            self.tenants[tenant['id']] = tenant
+        self._synced = True
+        self.recount()
+
+    def __len__(self):
+        return len(self.tenants)
+
+    def recount(self):
+        tenants = self.tenants.values()
+        self.utilities_total = utilities_total(self.household)
+        self.total_room_size = sum(t.get('room_size', 0) for t in tenants)
+        self.total_percentage = sum(t.get('percentage', 0) for t in tenants)
+
+    def sync(self):
+        if not self._synced:
+            if isinstance(self.household['tenants'], list):
+                self.household['tenants'][:] = self.tenants.values()
+            else:
+                self.household['tenants'] = list(self.tenants.values())
+            self._synced = True
+        return self.household['tenants']
+
+    def add_tenant(self, tenant):
+        if not tenant.get('id') or tenant['id'] in self.tenants:
+            tenant['id'] = new_tenant_id()
+        self.tenants[tenant['id']] = tenant
+        if self._synced:
+            self.household['tenants'].append(tenant)
+        self.total_room_size += tenant.get('room_size', 0)
+        self.total_percentage += tenant.get('percentage', 0)
+        return tenant['id']
+
+    def update_tenant(self, tenant_id, **fields):
+        tenant = self.tenants[tenant_id]
+        self.total_room_size -= tenant.get('room_size', 0)
+        self.total_percentage -= tenant.get('percentage', 0)
+        tenant.update(fields)
+        self.total_room_size += tenant.get('room_size', 0)
+        self.total_percentage += tenant.get('percentage', 0)
+        return tenant
+
+    def add_tenants(self, tenants):
+        return [self.add_tenant(t) for t in tenants]
+
+    def remove_tenant(self, tenant_id):
+        tenant = self.tenants.pop(tenant_id, None)
+        if tenant is not None:
+            self._synced = False
+            self.total_room_size -= tenant.get('room_size', 0)
+            self.total_percentage -= tenant.get('percentage', 0)
+            if not self.tenants:
+                # don't let float drift leave a tiny non-zero total behind
+                self.total_room_size = self.total_percentage = 0
+        return tenant
+
+    def remove_tenants(self, tenant_ids):
+        return [t for t in map(self.remove_tenant, tenant_ids) if t is not None]
+
+    def set_utility(self, name, utility):
+        utilities = self.household['utilities']
+        if name in utilities:
+            self.utilities_total -= utilities[name]['amount']
+        utilities[name] = utility
+        self.utilities_total += utility['amount']
+
+    def remove_utility(self, name):
+        utilities = self.household['utilities']
+        utility = utilities.pop(name, None)
+        if utility is not None:
+            self.utilities_total -= utility['amount']
+            if not utilities:
+                self.utilities_total = 0
+            for tenant in self.tenants.values():
+                tenant.get('usage', {}).pop(name, None)
+        return utility
+
+    def set_usage(self, name, readings):
+        # meter readings for a 'By Usage' utility, one per tenant in order
+        for tenant, reading in zip(self.tenants.values(), readings):
+            tenant.setdefault('usage', {})[name] = reading
+
+    def totals(self):
+        return self.utilities_total, self.total_room_size, self.total_percentage
+
+    def split(self, exact=False, cache=None, period=None):
+        # cache is an optional rent_cache.SplitCache; period (year, month)
+        # is needed once tenants have move-in or move-out dates
+        self.sync()
+        if cache is not None:
+            return cache.split(self.household, exact, self.totals(), period)
+        return split_household(self.household, exact, self.totals(), period)
+
+
+def new_tenant_id():
+    return uuid.uuid4().hex
+
+
+def split_households(households, exact=False):
+    # one bad flat must not abort a whole billing run, so failures are
+    # reported in place instead of raised
+    results = []
+    for household in households:
+        try:
+            results.append(split_household(household, exact))
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            results.append({'error': str(e)})
+    return results
+
+
+def split_portfolio(households, exact=False):
+    # same maths as split_households, but for a whole portfolio at once:
+    # tenants are flattened into columns, per-household sums are segmented
+    # sums over those columns and shares are one broadcast multiply.
+    # Utilities are flattened the same way into one (utility, tenant) pair
+    # per cell of every household's allocation matrix.
+    # Returns tenant-level columns plus {household index: error message};
+    # with exact=True shares are also given as integer paise that add up
+    # to each household's total.
+    if not _load_numpy():
+        return _split_portfolio_loop(households, exact)
+
+    households = list(households)
+    h_count = len(households)
+    counts = np.fromiter((len(h.get('tenants', [])) for h in households),
+                         dtype=np.int64, count=h_count)
+    # households with a value numpy can't take as it is (see _floats())
+    # are split by split_household instead
+    rents, odd = _floats([h.get('rent_amount', 0) for h in households])
+    maintenance, odd_maintenance = _floats([h.get('maintenance', 0) for h in households])
+    odd |= odd_maintenance
+    base = rents + maintenance
+    kinds = np.fromiter((_split_kind(h) for h in households),
+                        dtype=np.int64, count=h_count)
+
+    n = int(counts.sum())
+    room, odd_room = _floats([t.get('room_size', 0) for h in households for t in h.get('tenants', [])])
+    pct, odd_pct = _floats([t.get('percentage', 0) for h in households for t in h.get('tenants', [])])
+    owner = np.repeat(np.arange(h_count), counts)
+    starts = np.cumsum(counts) - counts
+    odd |= np.bincount(owner, weights=odd_room | odd_pct, minlength=h_count) > 0
+
+    room_sum = np.bincount(owner, weights=room, minlength=h_count)
+    pct_sum = np.bincount(owner, weights=pct, minlength=h_count)
+
+    bad = ((rents <= 0) | (counts == 0) | (kinds < 0) | odd
+           | ((kinds == 1) & (room_sum == 0))
+           | ((kinds == 2) & (np.abs(pct_sum - 100) > PERCENTAGE_TOLERANCE)))
+
+    kind_t = kinds[owner]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(kind_t == 0, 1.0 / counts[owner],
+                            np.where(kind_t == 1, room / room_sum[owner], pct / 100))
+
+    # households where anyone moves in or out that month: fractions are
+    # weighted by days in the flat and 'Equal' utilities split by them
+    equal_weight = np.ones(n)
+    dated = np.fromiter((bool(t.get('move_in') or t.get('move_out'))
+                         for h in households for t in h.get('tenants', [])), dtype=bool, count=n)
+    if dated.any():
+        prorated = np.bincount(owner, weights=dated, minlength=h_count) > 0
+        days, bad_dates = _occupied_days(households, prorated, owner)
+        weighted = fraction * days
+        weighted_sum = np.bincount(owner, weights=weighted, minlength=h_count)
+        bad |= bad_dates | (prorated & ~(weighted_sum > 0))
+        prorated_t = prorated[owner]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(prorated_t, weighted / weighted_sum[owner], fraction)
+        equal_weight = np.where(prorated_t, days, 1.0)
+
+    # allocation matrix: one pair per (utility, tenant of its household)
+    utils = [(i, util.get('amount', 0), _method_kind(util))
+             for i, h in enumerate(households) for util in h.get('utilities', {}).values()]
+    u_owner = np.fromiter((u[0] for u in utils), dtype=np.int64, count=len(utils))
+    u_amount, odd_amounts = _floats([u[1] for u in utils])
+    u_method = np.fromiter((u[2] for u in utils), dtype=np.int64, count=len(utils))
+    totals = base + np.bincount(u_owner, weights=u_amount, minlength=h_count)
+    bad |= ~np.isfinite(totals) | (np.bincount(u_owner, weights=odd_amounts, minlength=h_count) > 0)
+    u_counts = counts[u_owner]
+    n_pairs = int(u_counts.sum())
+    pair_util = np.repeat(np.arange(len(utils)), u_counts)
+    pair_offset = np.arange(n_pairs) - np.repeat(np.cumsum(u_counts) - u_counts, u_counts)
+    pair_tenant = np.repeat(starts[u_owner], u_counts) + pair_offset
+    pair_method = u_method[pair_util]
+    usage = np.zeros(n_pairs)
+    by_usage = pair_method == 1
+    usage[by_usage], odd_usage = _floats(list(_pair_usage(households)))
+    bad |= np.bincount(u_owner[pair_util[by_usage]], weights=odd_usage, minlength=h_count) > 0
+    weight = np.where(pair_method == 1, usage,
+                      np.where(pair_method == 2, fraction[pair_tenant], equal_weight[pair_tenant]))
+    weight_sum = np.bincount(pair_util, weights=weight, minlength=len(utils))
+    no_readings = (u_method == 1) & (weight_sum <= 0)
+    bad |= np.bincount(u_owner[no_readings], minlength=h_count) > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        allocation = u_amount[pair_util] * weight / weight_sum[pair_util]
+    utility_share = np.bincount(pair_tenant, weights=allocation, minlength=n)
+
+    bad_t = bad[owner]
+    fraction[bad_t] = np.nan
+    share = fraction * base[owner] + utility_share
+    share[bad_t] = np.nan
+
+    # households the columns couldn't split: the error, or for odd ones
+    # split_household's result
+    errors, singles = {}, {}
+    for i in np.flatnonzero(bad):
+        try:
+            singles[int(i)] = split_household(households[i], exact)
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            errors[int(i)] = str(e)
+
+    result = {
+        'household': owner,
+        'share': share,
+        'percentage': fraction * 100,
+        'utility_share': np.where(bad_t, np.nan, utility_share),
+        'total_monthly': totals,
+        'errors': errors
+    }
+    if exact:
+        weights = np.rint(np.where(bad_t, 0, share) * WEIGHT_SCALE).astype(np.int64)
+        total_paise = np.fromiter((to_paise(t) if math.isfinite(t) else 0 for t in totals),
+                                  dtype=np.int64, count=h_count)
+        paise = _largest_remainder_segments(total_paise, weights, owner, counts)
+        result['total_paise'] = total_paise
+        result['share_paise'] = paise
+        result['share'] = np.where(bad_t, np.nan, paise / 100)
+    for i, single in singles.items():
+        rows = slice(starts[i], starts[i] + counts[i])
+        shares = single['shares']
+        result['share'][rows] = [t['share'] for t in shares]
+        result['percentage'][rows] = [t['percentage'] for t in shares]
+        result['utility_share'][rows] = [sum(row) for row in single['allocation']]
+        totals[i] = single['total_monthly']
+        if exact:
+            result['share_paise'][rows] = [t['share_paise'] for t in shares]
+            result['total_paise'][i] = single['total_paise']
+    return result
+
+
+def _floats(values):
+    # values as a float column, and which of them are odd: not what numpy
+    # would make of them (strings, None and the like, which it quietly
+    # converts or rejects, ints too big for a float) or not finite
+    if _PLAIN_NUMBERS.issuperset(map(type, values)):
+        try:
+            column = np.fromiter(values, dtype=float, count=len(values))
+            return column, ~np.isfinite(column)
+        except OverflowError:
+            pass
+    column = np.empty(len(values))
+    for i, value in enumerate(values):
+        try:
+            column[i] = value if isinstance(value, numbers.Real) else math.nan
+        except OverflowError:
+            column[i] = math.nan
+    return column, ~np.isfinite(column)
+
+
+_PLAIN_NUMBERS = frozenset((int, float, bool))
+
+
+def _method_kind(utility):
+    method = utility.get('split_method', 'Equal')
+    return 1 if method == 'By Usage' else 2 if method == 'Custom' else 0
+
+
+def _pair_usage(households):
+    # meter readings of every 'By Usage' (utility, tenant) pair, in pair order
+    for h in households:
+        tenants = h.get('tenants', [])
+        for name, util in h.get('utilities', {}).items():
+            if util.get('split_method') == 'By Usage':
+                for t in tenants:
+                    yield t.get('usage', {}).get(name, 0)
+
+
+def _occupied_days(households, prorated, owner):
+    # occupied_days() for every tenant at once, as day numbers since
+    # 1970-01-01. Returns each tenant's days in the flat (only meaningful
+    # in prorated households) and the prorated households whose period or
+    # dates can't be used.
+    h_count = len(households)
+    periods = [_period_index(h) if p else 0 for h, p in zip(households, prorated)]
+    bad = prorated & (np.array(periods, dtype=np.int64) < 0)
+    months = np.maximum(np.array(periods, dtype=np.int64), 0).astype('datetime64[M]')
+    first = months.astype('datetime64[D]').astype(np.int64)
+    last = (months + 1).astype('datetime64[D]').astype(np.int64) - 1
+
+    start = _day_numbers(households, prorated, 'move_in', _OPEN_START)
+    end = _day_numbers(households, prorated, 'move_out', _OPEN_END)
+    unusable = (start == _BAD_DATE) | (end == _BAD_DATE) | (start > end)
+    bad |= np.bincount(owner, weights=unusable, minlength=h_count) > 0
+
+    days = np.minimum(end, last[owner]) - np.maximum(start, first[owner]) + 1
+    days = np.maximum(days, 0).astype(float)
+    bad |= prorated & (np.bincount(owner, weights=days, minlength=h_count) == 0)
+    return days, bad
+
+
+# sentinels for _day_numbers: no move-in, no move-out, unreadable date
+_OPEN_START = -(1 << 40)
+_OPEN_END = 1 << 40
+_BAD_DATE = -(1 << 41)
+_EPOCH = datetime.date(1970, 1, 1)
+_FIRST_DAY = (datetime.date.min - _EPOCH).days
+_LAST_DAY = (datetime.date.max - _EPOCH).days
+
+
+def _period_index(household):
+    # months since 1970-01, or -1 when the household's period is unusable
+    year, month = household.get('year'), household.get('month')
+    if not (isinstance(year, int) and isinstance(month, int) and 1 <= year <= 9999 and 1 <= month <= 12):
+        return -1
+    return (year - 1970) * 12 + month - 1
+
+
+def _day_numbers(households, prorated, key, missing):
+    # every tenant's move_in or move_out as a day number; the given dates
+    # are parsed by numpy as one datetime64 column, and only a column it
+    # can't take whole (a bad date in it) is parsed one date at a time
+    values = [t.get(key) if p else None for h, p in zip(households, prorated) for t in h.get('tenants', [])]
+    days = np.full(len(values), missing, dtype=np.int64)
+    given = [i for i, value in enumerate(values) if value]
+    if not given:
+        return days
+    dates = [values[i] for i in given]
+    try:
+        # YYYY-MM-DD strings only, as date.fromisoformat reads them
+        if (np.fromiter(map(len, dates), dtype=np.int64, count=len(dates)) != 10).any():
+            raise ValueError
+        parsed = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+        if ((parsed < _FIRST_DAY) | (parsed > _LAST_DAY)).any():
+            raise ValueError
+        days[given] = parsed
+    except (TypeError, ValueError):
+        days[given] = [_day_number(value) for value in dates]
+    return days
+
+
+def _day_number(value):
+    try:
+        return (datetime.date.fromisoformat(value) - _EPOCH).days
+    except (TypeError, ValueError):
+        return _BAD_DATE
+
+
+def _largest_remainder_segments(totals, weights, owner, counts):
+    # largest_remainder for every household at once; owner must be sorted
+    weight_sum = np.bincount(owner, weights=weights, minlength=len(totals)).astype(np.int64)
+    safe_sum = np.maximum(weight_sum, 1)[owner]
+    if len(totals) and int(totals.max()) * int(weight_sum.max()) > np.iinfo(np.int64).max:
+        # total * weight would overflow int64 (from about ₹30 lakh a
+        # month); Python ints are exact, and the parts and remainders fit
+        # back into int64
+        products = totals[owner].astype(object) * weights.astype(object)
+    else:
+        products = totals[owner] * weights
+    parts = (products // safe_sum).astype(np.int64)
+    remainders = (products % safe_sum).astype(np.int64)
+    leftover = totals - np.bincount(owner, weights=parts, minlength=len(totals)).astype(np.int64)
+    leftover[weight_sum == 0] = 0
+
+    index = np.arange(len(owner))
+    order = np.lexsort((index, -remainders, owner))
+    starts = np.cumsum(counts) - counts
+    rank = index - starts[owner[order]]
+    parts[order] += rank < leftover[owner[order]]
+    return parts
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+    return True
+
+
+def _split_kind(household):
+    split_type = household.get('split_type', 'equal')
+    return SPLIT_TYPES.index(split_type) if split_type in SPLIT_TYPES else -1
+
+
+def _split_portfolio_loop(households, exact=False):
+    owner, share, percentage, totals, errors = [], [], [], [], {}
+    utility_share, share_paise, total_paise = [], [], []
+    for i, household in enumerate(households):
+        tenants = household.get('tenants', [])
+        try:
+            result = split_household(household, exact)
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            errors[i] = str(e)
+            owner.extend([i] * len(tenants))
+            share.extend([float('nan')] * len(tenants))
+            percentage.extend([float('nan')] * len(tenants))
+            utility_share.extend([float('nan')] * len(tenants))
+            share_paise.extend([0] * len(tenants))
+            try:
+                totals.append(float(monthly_total(household)))
+            except (TypeError, ValueError, OverflowError):
+                totals.append(math.nan)
+            total_paise.append(to_paise(totals[-1]) if math.isfinite(totals[-1]) else 0)
+            continue
+        for tenant, row in zip(result['shares'], result['allocation']):
+            owner.append(i)
+            share.append(tenant['share'])
+            percentage.append(tenant['percentage'])
+            utility_share.append(sum(row))
+            share_paise.append(tenant.get('share_paise'))
+        totals.append(result['total_monthly'])
+        total_paise.append(result.get('total_paise'))
+
+    result = {
+        'household': owner,
+        'share': share,
+        'percentage': percentage,
+        'utility_share': utility_share,
+        'total_monthly': totals,
+        'errors': errors
+    }
+    if exact:
+        result['share_paise'] = share_paise
+        result['total_paise'] = total_paise
+    return result
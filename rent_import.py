@@ -0,0 +1,105 @@
+import csv
+
+from rent_engine import make_tenant, make_utility
+
+# only this many errors are kept (and shown); the rest are just counted
+MAX_ERRORS = 50
+
+# header spellings we accept, after lower-casing and dropping anything
+# in brackets, e.g. "Room Size (sq ft)" -> "room size"
+TENANT_COLUMNS = {
+    'name': 'name', 'tenant': 'name', 'tenant name': 'name',
+    'room size': 'room_size', 'room_size': 'room_size', 'room': 'room_size',
+    'percentage': 'percentage', 'percent': 'percentage', '%': 'percentage',
+    'move in': 'move_in', 'move_in': 'move_in', 'moved in': 'move_in',
+    'move out': 'move_out', 'move_out': 'move_out', 'moved out': 'move_out'
+}
+UTILITY_COLUMNS = {
+    'name': 'name', 'utility': 'name',
+    'amount': 'amount',
+    'split': 'split_method', 'split method': 'split_method', 'split_method': 'split_method',
+    'readings': 'readings', 'usage': 'readings',
+    'notes': 'notes'
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.records = []
+        self.errors = []
+        self.error_count = 0
+        self.rows = 0
+
+    def error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Line {line_no}: {message}")
+
+    def summary(self):
+        lines = list(self.errors)
+        if self.error_count > len(self.errors):
+            lines.append(f"... and {self.error_count - len(self.errors)} more")
+        return '\n'.join(lines)
+
+
+def import_tenants(path, split_type):
+    # Streams a tenants CSV (name, room size, percentage, optional move in
+    # and move out dates) row by row and
+    # validates each row the way add_tenant does. Nothing is added unless
+    # every row is valid; the caller inserts result.records in one go.
+    result = ImportResult()
+    for line_no, row in _rows(path, TENANT_COLUMNS, ('name',), result):
+        try:
+            result.records.append(make_tenant(row.get('name'), row.get('room_size'),
+                                              row.get('percentage'), split_type,
+                                              row.get('move_in'), row.get('move_out')))
+        except ValueError as e:
+            result.error(line_no, e)
+    return result
+
+
+def import_utilities(path, tenant_count):
+    # Same for utilities (name, amount, split method, readings, notes);
+    # records are (name, utility, meter readings or None) as returned by
+    # make_utility
+    result = ImportResult()
+    for line_no, row in _rows(path, UTILITY_COLUMNS, ('name', 'amount'), result):
+        try:
+            result.records.append(make_utility(row.get('name'), row.get('amount'), row.get('split_method'),
+                                               row.get('notes'), row.get('readings'), tenant_count))
+        except ValueError as e:
+            result.error(line_no, e)
+    return result
+
+
+def _rows(path, columns, required, result):
+    # yields (line number, {column: text}); Excel's UTF-8 BOM and
+    # semicolon separated exports are handled
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+
+        header = next(reader, None)
+        if header is None:
+            result.error(1, "The file is empty")
+            return
+        keys = [columns.get(_header_key(h)) for h in header]
+        missing = [c for c in required if c not in keys]
+        if missing:
+            result.error(1, f"Missing column(s): {', '.join(missing)}")
+            return
+
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            result.rows += 1
+            yield reader.line_num, {k: v for k, v in zip(keys, values) if k}
+
+
+def _header_key(header):
+    return header.split('(')[0].strip().lower()
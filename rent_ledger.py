@@ -0,0 +1,280 @@
+import datetime
+import math
+import sqlite3
+
+from rent_db import DB_FILE
+from rent_engine import exact_paise, tenant_keys, to_paise
+
+# a period's shares fall due on this day of the month, as the report's
+# payment instructions tell tenants
+DUE_DAY = 5
+
+# Amounts are integer paise: charges positive, payments negative. Each
+# entry stores the tenant's running balance after it, in (entry_date, id)
+# order, so the balance on any date is the last entry on or before that
+# date: one lookup in ledger_by_tenant. balances holds every tenant's
+# latest balance; its partial index lists the tenants who owe money.
+# tenant is the account: the tenant's id (see rent_engine.tenant_keys());
+# name is kept alongside for display.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ledger (
+    id INTEGER PRIMARY KEY,
+    household TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    entry_date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    year INTEGER,
+    month INTEGER,
+    amount INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    reference TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS ledger_by_tenant ON ledger (household, tenant, entry_date);
+CREATE UNIQUE INDEX IF NOT EXISTS ledger_charges ON ledger (household, year, month, tenant)
+    WHERE kind = 'charge';
+CREATE TABLE IF NOT EXISTS balances (
+    household TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    balance INTEGER NOT NULL,
+    last_date TEXT NOT NULL,
+    PRIMARY KEY (household, tenant)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS balances_owing ON balances (last_date) WHERE balance > 0;
+CREATE INDEX IF NOT EXISTS balances_by_date ON balances (last_date);
+'''
+
+
+class PaymentLedger:
+    # Lives in the same SQLite file as RentDatabase. Accounts are keyed by
+    # household and tenant id, so tenants who share a name keep separate
+    # balances.
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # the name columns came after the first release of the schema
+        with self.conn:
+            for table in ('ledger', 'balances'):
+                columns = [row['name'] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+                if 'name' not in columns:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN name TEXT NOT NULL DEFAULT ''")
+
+    def close(self):
+        self.conn.close()
+
+    def post_charges(self, household, year, month, result):
+        # each tenant's share of a split_household() result in exact
+        # paise, due on DUE_DAY; posting the same period again replaces
+        # the amounts, and zeroes those of tenants no longer in it
+        with self.conn:
+            self._append(self._charges(household, year, month, result))
+
+    def post_charges_many(self, rows):
+        # bulk variant taking RentDatabase.save_periods() rows:
+        # (household, year, month, rent_data, result). A period given
+        # more than once is posted as its last row, as save_periods()
+        # keeps the last one
+        latest = {}
+        for household, year, month, _, result in rows:
+            latest[household, year, month] = result
+        with self.conn:
+            fresh = []
+            for (household, year, month), result in latest.items():
+                fresh += self._charges(household, year, month, result)
+            self._append(fresh)
+
+    def record_payment(self, household, tenant, amount, date=None, reference='', year=None, month=None):
+        # tenant is the account, i.e. the tenant's id
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            amount = math.nan
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError("Please enter a valid payment amount!")
+        date = _date(date)
+        with self.conn:
+            return self._insert(household, tenant, date, 'payment', -to_paise(amount), year, month, reference)
+
+    def record_payments(self, payments):
+        # bulk variant: (household, tenant, amount, date, reference) tuples
+        # in one transaction
+        entries = [(household, tenant, _date(date), 'payment', -to_paise(amount), None, None, reference, '')
+                   for household, tenant, amount, date, reference in payments]
+        with self.conn:
+            self._append(entries)
+
+    def balance(self, household, tenant, as_of=None):
+        # what the tenant owes (negative: paid ahead) after everything
+        # dated on or before as_of; all entries when as_of is None
+        if as_of is None:
+            row = self.conn.execute('SELECT balance FROM balances WHERE household = ? AND tenant = ?',
+                                    (household, tenant)).fetchone()
+            return row[0] / 100 if row else 0.0
+        return self._balance(household, tenant, _date(as_of)) / 100
+
+    def balances(self, household):
+        return {row['tenant']: row['balance'] / 100 for row in self.conn.execute(
+            'SELECT tenant, balance FROM balances WHERE household = ? ORDER BY tenant', (household,))}
+
+    def arrears(self, as_of=None, household=None):
+        # tenants who owe money as of a date (default today), across all
+        # households or one, largest balance first. Tenants with nothing
+        # after as_of come straight from balances_owing; the rest (e.g.
+        # next month's charges already posted) take one lookup each.
+        as_of = _date(as_of)
+        where, params = '', [as_of]
+        if household is not None:
+            where, params = ' AND household = ?', [as_of, household]
+        owing = [(row['household'], row['tenant'], row['name'], row['balance']) for row in self.conn.execute(
+            f'SELECT household, tenant, name, balance FROM balances '
+            f'WHERE balance > 0 AND last_date <= ?{where}', params)]
+        for row in self.conn.execute(f'SELECT household, tenant, name FROM balances WHERE last_date > ?{where}',
+                                     params):
+            balance = self._balance(row['household'], row['tenant'], as_of)
+            if balance > 0:
+                owing.append((row['household'], row['tenant'], row['name'], balance))
+        owing.sort(key=lambda row: (-row[3], row[0], row[1]))
+        return [{'household': h, 'tenant': t, 'name': name, 'balance': b / 100} for h, t, name, b in owing]
+
+    def statement(self, household, tenant, start=None, end=None):
+        # entries in date order with the running balance after each
+        query = ('SELECT entry_date, kind, year, month, amount, balance, reference FROM ledger '
+                 'WHERE household = ? AND tenant = ?')
+        params = [household, tenant]
+        if start is not None:
+            query += ' AND entry_date >= ?'
+            params.append(_date(start))
+        if end is not None:
+            query += ' AND entry_date <= ?'
+            params.append(_date(end))
+        query += ' ORDER BY entry_date, id'
+        return [dict(row, amount=row['amount'] / 100, balance=row['balance'] / 100)
+                for row in self.conn.execute(query, params)]
+
+    def _charges(self, household, year, month, result):
+        # updates the period's existing charges in place and returns the
+        # new ones as entries for _append()
+        due = datetime.date(year, month, DUE_DAY).isoformat()
+        shares = result['shares']
+        posted = {row['tenant']: row for row in self.conn.execute(
+            "SELECT tenant, id, entry_date, amount FROM ledger WHERE household = ? AND year = ? "
+            "AND month = ? AND kind = 'charge'", (household, year, month))}
+        fresh = []
+        for tenant, share, paise in zip(tenant_keys(shares), shares, exact_paise(result)):
+            row = posted.pop(tenant, None)
+            if row is None:
+                fresh.append((household, tenant, due, 'charge', paise, year, month, '', share['name']))
+            elif row['amount'] != paise:
+                self._amend(household, tenant, row, paise)
+        # tenants removed since the period was last posted owe nothing
+        # for it
+        for tenant, row in posted.items():
+            if row['amount']:
+                self._amend(household, tenant, row, 0)
+        return fresh
+
+    def _amend(self, household, tenant, row, paise):
+        self.conn.execute('UPDATE ledger SET amount = ? WHERE id = ?', (paise, row['id']))
+        self._shift(household, tenant, row['entry_date'], row['id'], paise - row['amount'])
+
+    def _append(self, entries):
+        # entries are (household, tenant, date, kind, amount, year, month,
+        # reference, name). Each tenant's entries are taken in date order; those
+        # dated before the tenant's last ledger entry are inserted one by
+        # one, the rest (usually all of them) get their running balances
+        # computed here and go in with one executemany.
+        by_tenant = {}
+        for entry in entries:
+            by_tenant.setdefault(entry[:2], []).append(entry)
+        known = self._latest({key[0] for key in by_tenant})
+        rows, latest = [], []
+        for key, group in by_tenant.items():
+            group.sort(key=lambda entry: entry[2])
+            balance, last_date = known.get(key, (0, ''))
+            late = 0
+            while late < len(group) and group[late][2] < last_date:
+                self._insert(*group[late])
+                balance += group[late][4]
+                late += 1
+            for entry in group[late:]:
+                balance += entry[4]
+                rows.append(entry + (balance,))
+            if late < len(group):
+                name = next((entry[8] for entry in reversed(group) if entry[8]), '')
+                latest.append(key + (name, balance, group[-1][2]))
+        self.conn.executemany(
+            'INSERT INTO ledger (household, tenant, entry_date, kind, amount, year, month, reference, name, balance) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.conn.executemany(
+            'INSERT INTO balances (household, tenant, name, balance, last_date) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (household, tenant) DO UPDATE SET balance = excluded.balance, '
+            "last_date = excluded.last_date, name = CASE excluded.name WHEN '' THEN name ELSE excluded.name END",
+            latest)
+
+    def _latest(self, households):
+        # {(household, tenant): (balance, last date)} for every tenant of
+        # the given households
+        households = list(households)
+        latest = {}
+        for i in range(0, len(households), 500):
+            batch = households[i:i + 500]
+            for row in self.conn.execute(
+                    f"SELECT household, tenant, balance, last_date FROM balances "
+                    f"WHERE household IN ({','.join('?' * len(batch))})", batch):
+                latest[row[0], row[1]] = (row[2], row[3])
+        return latest
+
+    def _insert(self, household, tenant, date, kind, amount, year=None, month=None, reference='', name=''):
+        row = self.conn.execute('SELECT last_date FROM balances WHERE household = ? AND tenant = ?',
+                                (household, tenant)).fetchone()
+        back_dated = row is not None and row['last_date'] > date
+        before = self._balance(household, tenant, date)
+        entry_id = self.conn.execute(
+            'INSERT INTO ledger (household, tenant, entry_date, kind, amount, year, month, reference, name, balance) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (household, tenant, date, kind, amount, year, month, reference, name, before + amount)).lastrowid
+        if back_dated:
+            # every later entry's running balance moves by the new amount
+            self.conn.execute('UPDATE ledger SET balance = balance + ? WHERE household = ? AND tenant = ? '
+                              'AND entry_date > ?', (amount, household, tenant, date))
+        self.conn.execute(
+            'INSERT INTO balances (household, tenant, name, balance, last_date) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (household, tenant) DO UPDATE SET balance = balance + excluded.balance, '
+            "last_date = max(last_date, excluded.last_date), "
+            "name = CASE excluded.name WHEN '' THEN name ELSE excluded.name END",
+            (household, tenant, name, amount, date))
+        return entry_id
+
+    def _shift(self, household, tenant, date, entry_id, delta):
+        # a charge changed by delta: it and everything after it move
+        self.conn.execute('UPDATE ledger SET balance = balance + ? WHERE household = ? AND tenant = ? '
+                          'AND (entry_date > ? OR (entry_date = ? AND id >= ?))',
+                          (delta, household, tenant, date, date, entry_id))
+        self.conn.execute('UPDATE balances SET balance = balance + ? WHERE household = ? AND tenant = ?',
+                          (delta, household, tenant))
+
+    def _balance(self, household, tenant, date):
+        row = self.conn.execute(
+            'SELECT balance FROM ledger WHERE household = ? AND tenant = ? AND entry_date <= ? '
+            'ORDER BY entry_date DESC, id DESC LIMIT 1', (household, tenant, date)).fetchone()
+        return row[0] if row else 0
+
+
+def _date(value):
+    # ISO dates sort as text; None means today
+    if value is None:
+        return datetime.date.today().isoformat()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError("Please enter dates as YYYY-MM-DD!") from None
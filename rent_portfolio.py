@@ -0,0 +1,178 @@
+import calendar
+import collections
+import datetime
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from rent_cache import SplitCache, line_key
+from rent_engine import split_household
+from rent_report import ReportWriter
+from rent_db import RentDatabase
+from rent_ledger import PaymentLedger
+from rent_profile import phase, count
+
+# households per task handed to a worker process; big enough that
+# pickling and scheduling are noise next to the splitting itself
+CHUNK_SIZE = 500
+
+# database rows are written in transactions of this many households
+DB_BATCH = 1000
+
+# one split cache per process and cache file
+_caches = {}
+
+
+def run_portfolio(input_path, output_path, workers=1, chunk_size=CHUNK_SIZE, exact=False,
+                  db_path=None, reports_path=None, report_format='text', cache_path=None):
+    # One household per input line, one result per output line, in input
+    # order. With workers > 1 chunks of lines are split in a process pool;
+    # at most two chunks per worker are in flight, so memory stays flat
+    # however long the input is. Database writes stay in this process.
+    # With reports_path every household's payment report is rendered in
+    # the workers and streamed to that file, in the same order. With
+    # cache_path households whose inputs are unchanged since an earlier
+    # run reuse that run's split. With db_path every tenant's share is
+    # also posted to the payment ledger as that period's charge. Returns
+    # (households, failed, cached).
+    workers = workers or default_workers()
+    database = RentDatabase(db_path) if db_path else None
+    ledger = PaymentLedger(db_path) if db_path else None
+    now = datetime.datetime.now()
+    options = (exact, report_format if reports_path else None, database is not None, now, cache_path)
+    infile = sys.stdin if input_path == '-' else open(input_path, 'r', encoding='utf-8')
+    outfile = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+    reports = ReportWriter(open(reports_path, 'w', encoding='utf-8'), report_format) if reports_path else None
+    totals = [0, 0, 0]
+    pending = []
+
+    def write(chunk_result):
+        lines, failed, rows, rendered, cached = chunk_result
+        count('batch.chunks')
+        with phase('batch.write'):
+            outfile.writelines(lines)
+            if reports and rendered:
+                reports.write_rendered(*rendered)
+        totals[0] += len(lines)
+        totals[1] += failed
+        totals[2] += cached
+        if database:
+            pending.extend(rows)
+            if len(pending) >= DB_BATCH:
+                with phase('batch.save_db'):
+                    database.save_periods(pending)
+                    ledger.post_charges_many(pending)
+                pending.clear()
+
+    try:
+        if reports:
+            reports.begin()
+        chunks = _chunks(infile, chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                with phase('batch.split_chunk'):
+                    chunk_result = split_chunk(chunk, *options)
+                write(chunk_result)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                in_flight = collections.deque()
+                for chunk in chunks:
+                    in_flight.append(pool.submit(split_chunk, chunk, *options))
+                    if len(in_flight) >= 2 * workers:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+        if database and pending:
+            database.save_periods(pending)
+            ledger.post_charges_many(pending)
+        if reports:
+            reports.end()
+    finally:
+        if reports:
+            reports.out.close()
+        if database:
+            database.close()
+            ledger.close()
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    count('batch.households', totals[0])
+    count('batch.failed', totals[1])
+    count('batch.cached', totals[2])
+    return tuple(totals)
+
+
+def split_chunk(chunk, exact=False, report_format=None, keep=False, now=None, cache_path=None):
+    # runs in a worker process: (line number, line) pairs in; encoded
+    # output lines, the failure count, (with keep) database rows, (with
+    # report_format) the chunk's rendered reports and the number of
+    # cached splits out
+    now = now or datetime.datetime.now()
+    lines, rows, fresh = [], [], []
+    reports = ReportWriter(io.StringIO(), report_format) if report_format else None
+    failed = 0
+    cache = _cache(cache_path) if cache_path else None
+    keys = [line_key(line, exact) for _, line in chunk] if cache else None
+    known = cache.load_encoded(keys) if cache else {}
+
+    for i, (line_no, line) in enumerate(chunk):
+        # output records are '{"line": N, ' + the cached rest of the record
+        prefix = f'{{"line": {line_no}, '
+        encoded = known.get(keys[i]) if cache else None
+        if encoded is not None and not (reports or keep):
+            lines.append(prefix + encoded)
+            continue
+
+        record = {'line': line_no}
+        try:
+            household = json.loads(line)
+            if 'id' in household:
+                record['id'] = household['id']
+            year, month = household.get('year', now.year), household.get('month', now.month)
+            datetime.date(year, month, 1)  # rejects a bad year or month
+            if encoded is not None:
+                result = json.loads('{' + encoded)
+                result.pop('id', None)
+            else:
+                result = split_household(household, exact)
+            record.update(result)
+            if reports:
+                reports.write(household, result, f"{calendar.month_name[month]} {year}", now)
+            if keep:
+                rows.append((str(household.get('id', f"line-{line_no}")), year, month, household, result))
+        except (ValueError, KeyError, TypeError, AttributeError, IndexError, OverflowError) as e:
+            record['error'] = str(e)
+            failed += 1
+        text = json.dumps(record, ensure_ascii=False) + '\n'
+        lines.append(text)
+        if cache and encoded is None and 'error' not in record:
+            fresh.append((keys[i], text[len(prefix):]))
+
+    if cache:
+        cache.store_encoded(fresh)
+    return lines, failed, rows, (reports.out.getvalue(), reports.count) if reports else None, len(known)
+
+
+def _cache(path):
+    if path not in _caches:
+        _caches[path] = SplitCache(path=path)
+    return _caches[path]
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _chunks(lines, size):
+    chunk = []
+    for line_no, line in enumerate(lines, 1):
+        if line.strip():
+            chunk.append((line_no, line))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
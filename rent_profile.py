@@ -0,0 +1,115 @@
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Opt-in timing. Code marks its phases with
+#     with phase('calculate.compute'):
+# and bumps counters with count('tree.rows', n). Both cost next to
+# nothing until enable() is called (the --profile flag or RENT_PROFILE
+# environment variable); from then on every phase's count, total, mean
+# and max time are kept and written as JSON when the process exits.
+# cProfile can be captured alongside (--cprofile / RENT_CPROFILE), for
+# the main thread only.
+
+PROFILE_ENV = 'RENT_PROFILE'
+CPROFILE_ENV = 'RENT_CPROFILE'
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_phases = {}
+_counters = {}
+_state = {'enabled': False, 'path': None, 'started': None, 'profiler': None, 'cprofile_path': None}
+
+
+def enable(path, cprofile_path=None):
+    if _state['enabled']:
+        return
+    _state.update(enabled=True, path=path, started=time.time())
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _state.update(profiler=profiler, cprofile_path=cprofile_path)
+    atexit.register(dump)
+
+
+def enable_from_env():
+    path = os.environ.get(PROFILE_ENV)
+    if path:
+        enable(path, os.environ.get(CPROFILE_ENV))
+
+
+def enabled():
+    return _state['enabled']
+
+
+def phase(name):
+    return _Phase(name) if _state['enabled'] else _NULL
+
+
+def count(name, n=1):
+    if _state['enabled']:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def record(name, seconds):
+    with _lock:
+        stats = _phases.get(name)
+        if stats is None:
+            stats = _phases[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+def summary():
+    with _lock:
+        phases = {name: {'count': n, 'total_ms': round(total * 1000, 3),
+                         'mean_ms': round(total / n * 1000, 3), 'max_ms': round(peak * 1000, 3)}
+                  for name, (n, total, peak) in sorted(_phases.items())}
+        counters = dict(sorted(_counters.items()))
+    started = _state['started']
+    return {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)) if started else None,
+        'wall_s': round(time.time() - started, 3) if started else 0,
+        'pid': os.getpid(),
+        'phases': phases,
+        'counters': counters
+    }
+
+
+def dump():
+    profiler = _state['profiler']
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(_state['cprofile_path'])
+        _state['profiler'] = None
+    path = _state['path']
+    if not path:
+        return
+    data = json.dumps(summary(), indent=2)
+    if path == '-':
+        print(data, file=sys.stderr)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+
+
+class _Phase:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,259 @@
+import json
+import math
+from array import array
+
+# Compact in-memory forms of the rent_data shape. Tenant, Utility and
+# Household use __slots__, which drops the per-record dict; Portfolio
+# goes further and keeps every tenant of every household in typed
+# columns. All of them convert to and from the plain dicts saved in
+# rent_calculator_data.json(l), and Tenant and Household also answer
+# get()/[] like those dicts, so the split engine takes them as they are.
+
+HOUSEHOLD_KEYS = ('rent_amount', 'utilities', 'tenants', 'split_type', 'security_deposit', 'maintenance')
+TENANT_KEYS = ('name', 'room_size', 'percentage', 'id', 'usage')
+UTILITY_KEYS = ('amount', 'split_method', 'notes')
+
+
+class Record:
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class Tenant(Record):
+    __slots__ = ('name', 'room_size', 'percentage', 'id', 'usage', 'extra')
+
+    def __init__(self, name, room_size=0, percentage=0, id=None, usage=None, extra=None):
+        self.name = name
+        self.room_size = room_size
+        self.percentage = percentage
+        self.id = id
+        self.usage = usage or None
+        self.extra = extra or None
+
+    def get(self, key, default=None):
+        # move_in, move_out and any other keys live in extra
+        if key in TENANT_KEYS:
+            return Record.get(self, key, default)
+        return (self.extra or {}).get(key, default)
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {k: v for k, v in data.items() if k not in TENANT_KEYS}
+        return cls(data['name'], data.get('room_size', 0), data.get('percentage', 0),
+                   data.get('id'), data.get('usage'), extra)
+
+    def to_dict(self):
+        data = {'name': self.name, 'room_size': self.room_size, 'percentage': self.percentage}
+        if self.id is not None:
+            data['id'] = self.id
+        if self.usage:
+            data['usage'] = dict(self.usage)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class Utility(Record):
+    __slots__ = ('amount', 'split_method', 'notes')
+
+    def __init__(self, amount, split_method='Equal', notes=''):
+        self.amount = amount
+        self.split_method = split_method
+        self.notes = notes
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['amount'], data.get('split_method', 'Equal'), data.get('notes', ''))
+
+    def to_dict(self):
+        return {'amount': self.amount, 'split_method': self.split_method, 'notes': self.notes}
+
+
+class Household(Record):
+    # tenants is a list of Tenant; utilities a dict of name -> Utility.
+    # Keys beyond the rent_data shape (id, year, month of batch input)
+    # are kept in extra.
+    __slots__ = ('rent_amount', 'utilities', 'tenants', 'split_type', 'security_deposit',
+                 'maintenance', 'extra')
+
+    def __init__(self, rent_amount=0, utilities=None, tenants=None, split_type='equal',
+                 security_deposit=0, maintenance=0, extra=None):
+        self.rent_amount = rent_amount
+        self.utilities = utilities if utilities is not None else {}
+        self.tenants = tenants if tenants is not None else []
+        self.split_type = split_type
+        self.security_deposit = security_deposit
+        self.maintenance = maintenance
+        self.extra = extra or None
+
+    def get(self, key, default=None):
+        if key in HOUSEHOLD_KEYS:
+            return getattr(self, key)
+        return (self.extra or {}).get(key, default)
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {k: v for k, v in data.items() if k not in HOUSEHOLD_KEYS}
+        return cls(data.get('rent_amount', 0),
+                   {name: Utility.from_dict(u) for name, u in data.get('utilities', {}).items()},
+                   [Tenant.from_dict(t) for t in data.get('tenants', [])],
+                   data.get('split_type', 'equal'), data.get('security_deposit', 0),
+                   data.get('maintenance', 0), extra)
+
+    def to_dict(self):
+        data = {
+            'rent_amount': self.rent_amount,
+            'utilities': {name: u.to_dict() for name, u in self.utilities.items()},
+            'tenants': [t.to_dict() for t in self.tenants],
+            'split_type': self.split_type,
+            'security_deposit': self.security_deposit,
+            'maintenance': self.maintenance
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class TenantTable:
+    # Tenants as columns: names and ids in lists, room sizes and
+    # percentages in array('d'), meter readings in one array('d') per
+    # utility name (NaN where a tenant has no reading). Move-in/move-out
+    # dates are rare, so they're kept by row in a dict.
+
+    def __init__(self):
+        self.names = []
+        self.ids = []
+        self.room_size = array('d')
+        self.percentage = array('d')
+        self.usage = {}
+        self.dates = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, tenant):
+        # tenant is a rent_data tenant dict
+        row = len(self.names)
+        self.names.append(tenant['name'])
+        self.ids.append(tenant.get('id'))
+        self.room_size.append(tenant.get('room_size', 0))
+        self.percentage.append(tenant.get('percentage', 0))
+        if tenant.get('move_in') or tenant.get('move_out'):
+            self.dates[row] = (tenant.get('move_in'), tenant.get('move_out'))
+        for name, reading in (tenant.get('usage') or {}).items():
+            column = self.usage.get(name)
+            if column is None:
+                column = self.usage[name] = array('d', [math.nan]) * row
+            column.append(reading)
+        for column in self.usage.values():
+            if len(column) == row:
+                column.append(math.nan)
+
+    def extend(self, tenants):
+        for tenant in tenants:
+            self.append(tenant)
+
+    def tenant(self, row):
+        data = {'name': self.names[row], 'room_size': self.room_size[row],
+                'percentage': self.percentage[row]}
+        if self.ids[row] is not None:
+            data['id'] = self.ids[row]
+        usage = {name: column[row] for name, column in self.usage.items() if not math.isnan(column[row])}
+        if usage:
+            data['usage'] = usage
+        if row in self.dates:
+            move_in, move_out = self.dates[row]
+            if move_in:
+                data['move_in'] = move_in
+            if move_out:
+                data['move_out'] = move_out
+        return data
+
+    def tenants(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        return [self.tenant(row) for row in range(start, stop)]
+
+    def __iter__(self):
+        return (self.tenant(row) for row in range(len(self)))
+
+
+class Portfolio:
+    # Many households in columns: household-level fields in arrays and
+    # lists indexed by household, all tenants in one TenantTable with
+    # starts[i] the first tenant row of household i. Iterating yields
+    # each household as a rent_data dict (rebuilt on the fly), so a
+    # Portfolio can be passed straight to split_households() or
+    # split_portfolio().
+
+    def __init__(self, households=()):
+        self.rent_amount = array('d')
+        self.maintenance = array('d')
+        self.security_deposit = array('d')
+        self.split_type = []
+        self.utilities = []
+        self.extra = []
+        self.starts = array('q')
+        self.tenants = TenantTable()
+        for household in households:
+            self.append(household)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, household):
+        self.rent_amount.append(household.get('rent_amount', 0))
+        self.maintenance.append(household.get('maintenance', 0))
+        self.security_deposit.append(household.get('security_deposit', 0))
+        self.split_type.append(_intern(household.get('split_type', 'equal')))
+        utilities = household.get('utilities') or {}
+        self.utilities.append(tuple((_intern(name), Utility.from_dict(u)) for name, u in utilities.items())
+                              if utilities else ())
+        extra = {k: v for k, v in household.items() if k not in HOUSEHOLD_KEYS}
+        self.extra.append(extra or None)
+        self.starts.append(len(self.tenants))
+        self.tenants.extend(household.get('tenants', []))
+
+    def household(self, i):
+        stop = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.tenants)
+        data = {
+            'rent_amount': self.rent_amount[i],
+            'utilities': {name: u.to_dict() for name, u in self.utilities[i]},
+            'tenants': self.tenants.tenants(self.starts[i], stop),
+            'split_type': self.split_type[i],
+            'security_deposit': self.security_deposit[i],
+            'maintenance': self.maintenance[i]
+        }
+        if self.extra[i]:
+            data.update(self.extra[i])
+        return data
+
+    def __iter__(self):
+        return (self.household(i) for i in range(len(self)))
+
+    @classmethod
+    def from_jsonl(cls, path):
+        # one household per line, as read by batch mode
+        portfolio = cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    portfolio.append(json.loads(line))
+        return portfolio
+
+
+_interned = {}
+
+
+def _intern(value):
+    # the same few split types and utility names repeat across a whole
+    # portfolio; keep one copy of each
+    return _interned.setdefault(value, value)
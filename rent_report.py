@@ -0,0 +1,256 @@
+import datetime
+import html
+import io
+import string
+
+# Reports are laid out as templates: lists of parts that are compiled
+# once, at import time, into Python functions (see Template). A part is
+#   "text {field}"                     formatted with the report fields
+#   ('if', field, part, ...)           only when fields[field] is truthy
+#   ('tenants', row)                   once per share; row may be a dict
+#                                      keyed by split type
+#   ('utilities', row, empty)          once per utility, or empty if none
+# Rendering writes straight to a file handle, so a bulk run never holds
+# more than one report's fields in memory.
+
+FORMATS = ('text', 'csv', 'html')
+
+SPLIT_LABELS = {'equal': "Equal ({tenant_count} tenants)", 'room': "By Room Size",
+                'custom': "Custom Percentage"}
+
+TEXT_ROWS = {
+    'equal': "{n}. {name:20} ₹{share:,.2f}\n",
+    'room': "{n}. {name:20} {room_size:,.0f} sq ft ({percentage:.1f}%) = ₹{share:,.2f}\n",
+    'custom': "{n}. {name:20} {percentage:.1f}% = ₹{share:,.2f}\n"
+}
+
+SUMMARY_TEXT = (
+    "{rule60}\n🏠 RENT CALCULATION FOR {title}\n{rule60}\n\n"
+    "📋 BASIC INFORMATION\n{rule40}\n"
+    "Monthly Rent:           ₹{rent_amount:,.2f}\n"
+    "Maintenance:            ₹{maintenance:,.2f}\n"
+    "Security Deposit:       ₹{security_deposit:,.2f}\n\n",
+    ('if', 'utilities_total',
+     "💡 UTILITIES BREAKDOWN (Total: ₹{utilities_total:,.2f})\n{rule40}\n",
+     ('utilities', "{name:20} ₹{amount:,.2f}  ({split_method})\n", ""),
+     "\n"),
+    "💰 MONTHLY TOTAL: ₹{total_monthly:,.2f}\n\n"
+    "⚖️ SPLIT TYPE: {split_label}\n{rule40}\n",
+    ('tenants', TEXT_ROWS),
+    "\n🏦 SECURITY DEPOSIT PER TENANT: ₹{deposit_per_tenant:,.2f}\n\n"
+    "💡 TIPS:\n"
+    "- Split utilities equally or based on usage\n"
+    "- Keep records of all payments\n"
+    "- Set payment deadlines\n"
+    "{rule60}\n"
+)
+
+REPORT_TEXT = (
+    "{rule70}\n📊 RENT PAYMENT REPORT\n{rule70}\n\n"
+    "Period: {period}\n"
+    "Generated on: {generated_on}\n\n"
+    "📋 PAYMENT DETAILS\n{dash70}\n"
+    "Monthly Rent:           ₹{rent_amount:,.2f}\n"
+    "Maintenance:            ₹{maintenance:,.2f}\n"
+    "Utilities:              ₹{utilities_total:,.2f}\n"
+    "{dash70}\n"
+    "TOTAL MONTHLY:          ₹{total_monthly:,.2f}\n\n"
+    "👥 TENANT PAYMENT BREAKDOWN\n{dash70}\n",
+    ('tenants', TEXT_ROWS),
+    "\n💡 UTILITIES DETAILS\n{dash70}\n",
+    ('utilities', "{name:25} ₹{amount:,.2f} ({split_method})\n", "No utilities added\n"),
+    "\n📋 PAYMENT INSTRUCTIONS\n{dash70}\n"
+    "1. Please pay your share by the 5th of each month\n"
+    "2. Use UPI, Bank Transfer, or Cash\n"
+    "3. Keep transaction ID for reference\n"
+    "4. Notify if payment will be delayed\n\n"
+    "{rule70}\n"
+)
+
+REPORT_CSV = (
+    ('tenants', "{household},{period},{name},{room_size:.0f},{percentage:.4f},{share:.2f}\n"),
+)
+
+REPORT_HTML = (
+    "<section class=\"report\">\n<h1>📊 Rent Payment Report</h1>\n"
+    "<p>Period: {period}<br>Generated on: {generated_on}</p>\n"
+    "<h2>📋 Payment Details</h2>\n<table>\n"
+    "<tr><th>Monthly Rent</th><td>₹{rent_amount:,.2f}</td></tr>\n"
+    "<tr><th>Maintenance</th><td>₹{maintenance:,.2f}</td></tr>\n"
+    "<tr><th>Utilities</th><td>₹{utilities_total:,.2f}</td></tr>\n"
+    "<tr><th>Total Monthly</th><td>₹{total_monthly:,.2f}</td></tr>\n</table>\n"
+    "<h2>👥 Tenant Payment Breakdown ({split_label})</h2>\n<table>\n"
+    "<tr><th>#</th><th>Tenant</th><th>Room Size (sq ft)</th><th>Percentage</th><th>Share</th></tr>\n",
+    ('tenants', "<tr><td>{n}</td><td>{name}</td><td>{room_size:,.0f}</td><td>{percentage:.1f}%</td>"
+                "<td>₹{share:,.2f}</td></tr>\n"),
+    "</table>\n<h2>💡 Utilities Details</h2>\n<table>\n",
+    ('utilities', "<tr><td>{name}</td><td>₹{amount:,.2f}</td><td>{split_method}</td></tr>\n",
+     "<tr><td colspan=\"3\">No utilities added</td></tr>\n"),
+    "</table>\n</section>\n"
+)
+
+HTML_HEAD = ("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+             "<title>Rent Payment Report</title>\n</head>\n<body>\n")
+HTML_TAIL = "</body>\n</html>\n"
+CSV_HEAD = "household,period,tenant,room_size,percentage,share\n"
+
+
+def _csv_escape(value):
+    if any(c in value for c in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+FIELDS = ('household', 'period', 'title', 'generated_on', 'rent_amount', 'maintenance',
+          'security_deposit', 'utilities_total', 'total_monthly', 'deposit_per_tenant',
+          'split_type', 'split_label', 'rule40', 'rule60', 'rule70', 'dash70')
+TENANT_FIELDS = ('n', 'household', 'period', 'name', 'room_size', 'percentage', 'share')
+UTILITY_FIELDS = ('name', 'amount', 'split_method')
+
+
+class Template:
+    # Compiled into one generated function per template, built from
+    # f-strings, so rendering is plain Python string formatting with
+    # no template parsing at run time.
+
+    def __init__(self, parts, escape=None, head='', tail=''):
+        self.escape = escape
+        self.head = head
+        self.tail = tail
+        self._generated_on = (None, '')
+        code = ['def render(F, shares, utilities, E):']
+        code += [f"    {name} = F[{name!r}]" for name in FIELDS]
+        code.append('    out = []')
+        self._emit(parts, code, '    ')
+        code.append("    return ''.join(out)")
+        namespace = {}
+        exec('\n'.join(code), namespace)
+        self._render = namespace['render']
+
+    def _emit(self, parts, code, indent):
+        esc = (lambda source: f"E({source})") if self.escape else (lambda source: source)
+        for part in parts:
+            if isinstance(part, str):
+                code.append(f"{indent}out.append({_fstring(part, FIELDS)})")
+            elif part[0] == 'if':
+                code.append(f"{indent}if {_field(part[1], FIELDS)}:")
+                self._emit(part[2:], code, indent + '    ')
+            elif part[0] == 'tenants':
+                rows = part[1] if isinstance(part[1], dict) else dict.fromkeys(SPLIT_LABELS, part[1])
+                values = esc("t['name']") + ", t['room_size'], t['percentage'], t['share']"
+                for i, (split_type, row) in enumerate(rows.items()):
+                    code.append(f"{indent}{'if' if i == 0 else 'elif'} split_type == {split_type!r}:")
+                    code.append(f"{indent}    out.extend([{_fstring(row, TENANT_FIELDS)} "
+                                f"for n, t in enumerate(shares, 1) "
+                                f"for name, room_size, percentage, share in (({values}),)])")
+            else:
+                row, empty = part[1], part[2]
+                code.append(f"{indent}if utilities:")
+                values = esc('key') + ", u['amount'], " + esc("u.get('split_method', 'Equal')")
+                code.append(f"{indent}    out.extend([{_fstring(row, UTILITY_FIELDS)} "
+                            f"for key, u in utilities.items() "
+                            f"for name, amount, split_method in (({values}),)])")
+                code.append(f"{indent}else:")
+                code.append(f"{indent}    out.append({empty!r})")
+
+    def render(self, household, result, period, out, generated_on=None):
+        fields = self._fields(household, result, period, generated_on)
+        out.write(self._render(fields, result['shares'], household.get('utilities') or {}, self.escape))
+
+    def _fields(self, household, result, period, generated_on):
+        escape = self.escape or str
+        shares = result['shares']
+        deposit = household.get('security_deposit', 0)
+        generated_on = generated_on or datetime.datetime.now()
+        # bulk runs pass the same timestamp for every report
+        if self._generated_on[0] != generated_on:
+            self._generated_on = (generated_on, generated_on.strftime('%Y-%m-%d %H:%M'))
+        return {
+            'household': escape(str(household.get('id', ''))),
+            'period': escape(period),
+            'title': escape(period.upper()),
+            'generated_on': self._generated_on[1],
+            'rent_amount': household.get('rent_amount', 0),
+            'maintenance': household.get('maintenance', 0),
+            'security_deposit': deposit,
+            'utilities_total': result['utilities_total'],
+            'total_monthly': result['total_monthly'],
+            'deposit_per_tenant': deposit / len(shares) if shares else 0,
+            'split_type': result['split_type'],
+            'split_label': SPLIT_LABELS.get(result['split_type'], '').format(tenant_count=len(shares)),
+            'rule40': '-' * 40,
+            'rule60': '=' * 60,
+            'rule70': '=' * 70,
+            'dash70': '-' * 70
+        }
+
+
+def _field(name, allowed):
+    if name not in allowed:
+        raise KeyError(f"Unknown report field: {name}")
+    return name
+
+
+def _fstring(template, allowed):
+    # "Total: {amount:,.2f}" -> f'Total: {amount:,.2f}'; every field is a
+    # local of the generated function, so the f-string needs no quotes
+    source = []
+    for literal, name, spec, conversion in string.Formatter().parse(template):
+        source.append(literal.replace('{', '{{').replace('}', '}}'))
+        if name is not None:
+            source.append('{' + _field(name, allowed) + (f'!{conversion}' if conversion else '')
+                          + (f':{spec}' if spec else '') + '}')
+    return 'f' + repr(''.join(source))
+
+
+TEMPLATES = {
+    ('summary', 'text'): Template(SUMMARY_TEXT),
+    ('report', 'text'): Template(REPORT_TEXT),
+    ('report', 'csv'): Template(REPORT_CSV, _csv_escape, head=CSV_HEAD),
+    ('report', 'html'): Template(REPORT_HTML, html.escape, head=HTML_HEAD, tail=HTML_TAIL)
+}
+
+
+class ReportWriter:
+    # Streams any number of reports of one format to a file handle: the
+    # CSV header or HTML document head once, then one report per write().
+    # Text reports are separated by a blank line.
+
+    def __init__(self, out, fmt='text', kind='report'):
+        self.out = out
+        self.template = TEMPLATES[kind, fmt]
+        self.separator = '\n' if fmt == 'text' else ''
+        self.count = 0
+
+    def begin(self):
+        self.out.write(self.template.head)
+        return self
+
+    def write(self, household, result, period, generated_on=None):
+        if self.count and self.separator:
+            self.out.write(self.separator)
+        self.template.render(household, result, period, self.out, generated_on)
+        self.count += 1
+
+    def write_rendered(self, text, count):
+        # count reports already rendered by another writer of the same
+        # format, e.g. one in a worker process
+        if count and self.count and self.separator:
+            self.out.write(self.separator)
+        self.out.write(text)
+        self.count += count
+
+    def end(self):
+        self.out.write(self.template.tail)
+
+
+def render_report(household, result, period, fmt='text', kind='report', generated_on=None):
+    out = io.StringIO()
+    writer = ReportWriter(out, fmt, kind).begin()
+    writer.write(household, result, period, generated_on)
+    writer.end()
+    return out.getvalue()
+
+
+def report_extension(fmt):
+    return {'text': '.txt', 'csv': '.csv', 'html': '.html'}[fmt]
@@ -0,0 +1,211 @@
+import collections
+import itertools
+import math
+
+from rent_engine import (QUICK_UTILITIES, household_period, is_prorated, occupied_days, prorate,
+                         split_fractions, utility_weights)
+
+# numpy is optional, as in rent_engine
+np = None
+
+# What-if sweeps over one household. Every tenant's share is linear in
+# rent + maintenance and in each utility's amount:
+#     share = base * fraction[split type] + sum(amount[u] * unit[split type][u])
+# so the fractions and per-utility unit allocations are worked out once
+# per split type, and every scenario is then a multiply-add over them.
+
+
+class Scenario(collections.namedtuple('Scenario', 'rent_change maintenance add split_type')):
+    # rent_change in percent; maintenance a new amount or None to keep
+    # the household's; add a tuple of utility names (Quick Add presets
+    # or the sweep's extra utilities) added at their own amounts;
+    # split_type None to keep the household's
+    __slots__ = ()
+
+    @property
+    def label(self):
+        parts = [f"Rent {self.rent_change:+g}%" if self.rent_change else "Rent as is"]
+        if self.maintenance is not None:
+            parts.append(f"Maintenance ₹{self.maintenance:,.0f}")
+        parts += [f"+ {name}" for name in self.add]
+        if self.split_type:
+            parts.append(self.split_type.capitalize())
+        return ", ".join(parts)
+
+
+def scenario_grid(rent_changes=(0,), maintenance=(None,), add=((),), split_types=(None,)):
+    # every combination of the given values
+    return [Scenario(r, m, tuple(a), s)
+            for r, m, a, s in itertools.product(rent_changes, maintenance, add, split_types)]
+
+
+def parse_values(text, message):
+    # "0, 5, 10" -> [0.0, 5.0, 10.0]; spaces or commas between values
+    try:
+        values = [float(v) for v in text.replace(',', ' ').split()]
+    except ValueError:
+        raise ValueError(message) from None
+    if not all(math.isfinite(v) for v in values):
+        raise ValueError(message)
+    return values
+
+
+def utility_subsets(names):
+    # all combinations of names, from none to all of them
+    names = list(names)
+    return [combo for k in range(len(names) + 1) for combo in itertools.combinations(names, k)]
+
+
+class ScenarioSweep:
+    # totals are the household's (utilities total, total room size, total
+    # percentage) when already known, e.g. from a SplitModel; extra is
+    # {name: {'amount', 'split_method'}} for utilities scenarios may add
+    # beyond the Quick Add presets; period (year, month) prorates tenants
+    # who move in or out, as split_household does
+
+    def __init__(self, household, totals=None, extra=None, period=None):
+        self.household = household
+        self.tenants = household.get('tenants', [])
+        self.rent_amount = household.get('rent_amount', 0)
+        self.maintenance = household.get('maintenance', 0)
+        self.utilities = dict(household.get('utilities', {}))
+        self.extra = {name: {'amount': amount, 'split_method': 'Equal'} for name, amount in QUICK_UTILITIES}
+        self.extra.update(extra or {})
+        self.totals = totals
+        self.period = period
+        self._days = None
+        self._fractions = {}
+        self._units = {}
+
+    def fractions(self, split_type):
+        # (fractions, None) or (None, error message), once per split type
+        if split_type not in self._fractions:
+            try:
+                if not self.tenants:
+                    raise ValueError("Please add at least one tenant!")
+                fractions = split_fractions(self.tenants, split_type, self.totals)
+                if self.days():
+                    fractions = prorate(fractions, self.days())
+                self._fractions[split_type] = (fractions, None)
+            except ValueError as e:
+                self._fractions[split_type] = (None, str(e))
+        return self._fractions[split_type]
+
+    def days(self):
+        # days each tenant is in the flat, or None when nobody moves in
+        # or out; raises ValueError for bad dates
+        if self._days is None:
+            try:
+                self._days = (occupied_days(self.tenants, *(self.period or household_period(self.household)))
+                              if is_prorated(self.tenants) else (), None)
+            except ValueError as e:
+                self._days = ((), str(e))
+        days, error = self._days
+        if error:
+            raise ValueError(error)
+        return days or None
+
+    def utility_share(self, split_type, add):
+        # (each tenant's share of all utilities, utilities total) once per
+        # split type and set of added utilities; added utilities replace
+        # household ones of the same name, as Quick Add does
+        key = (split_type, add)
+        if key not in self._units:
+            fractions = self.fractions(split_type)[0]
+            utilities = dict(self.utilities)
+            for name in add:
+                if name not in self.extra:
+                    raise ValueError(f"Unknown utility: {name}")
+                utilities[name] = self.extra[name]
+            shares = [0.0] * len(self.tenants)
+            for name, utility in utilities.items():
+                weights = utility_weights(name, utility, self.tenants, fractions, self.days())
+                amount = utility['amount'] / sum(weights)
+                shares = [s + amount * w for s, w in zip(shares, weights)]
+            self._units[key] = (shares, sum(u['amount'] for u in utilities.values()))
+        return self._units[key]
+
+    def run(self, scenarios):
+        scenarios = list(scenarios)
+        default_split = self.household.get('split_type', 'equal')
+        nan_row = [math.nan] * len(self.tenants)
+        # scenarios sharing a split type and added utilities share their
+        # fractions and utility shares
+        groups = {}
+        fraction_rows, utility_rows, group_totals, group_errors = [], [], [], []
+        bases, totals, group_of, errors = [], [], [], {}
+        for i, scenario in enumerate(scenarios):
+            key = (scenario.split_type or default_split, scenario.add)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = len(groups)
+                fractions, error = self.fractions(key[0])
+                utility_shares, utilities_total = nan_row, math.nan
+                if error is None:
+                    try:
+                        utility_shares, utilities_total = self.utility_share(*key)
+                    except ValueError as e:
+                        error = str(e)
+                fraction_rows.append(fractions if error is None else nan_row)
+                utility_rows.append(utility_shares)
+                group_totals.append(utilities_total)
+                group_errors.append(error)
+
+            rent = self.rent_amount * (1 + scenario.rent_change / 100)
+            maintenance = self.maintenance if scenario.maintenance is None else scenario.maintenance
+            error = "Please enter valid rent amount!" if rent <= 0 else group_errors[group]
+            if error:
+                errors[i] = error
+            bases.append(rent + maintenance)
+            group_of.append(group)
+            totals.append(math.nan if error else rent + maintenance + group_totals[group])
+
+        if _load_numpy():
+            index = np.array(group_of, dtype=np.int64)
+            shares = (np.array(bases)[:, None] * np.array(fraction_rows, dtype=float)[index]
+                      + np.array(utility_rows, dtype=float)[index])
+            if errors:
+                shares[list(errors)] = np.nan
+        else:
+            shares = [nan_row if i in errors else
+                      [base * f + u for f, u in zip(fraction_rows[group], utility_rows[group])]
+                      for i, (base, group) in enumerate(zip(bases, group_of))]
+        return SweepResult(scenarios, [t['name'] for t in self.tenants], shares, totals, errors)
+
+
+class SweepResult:
+    # shares[i][t] is tenant t's monthly share in scenarios[i] (a numpy
+    # array when numpy is installed); scenarios that can't be split are
+    # NaN in shares and totals, with the reason in errors[i]
+
+    def __init__(self, scenarios, names, shares, totals, errors):
+        self.scenarios = scenarios
+        self.names = names
+        self.shares = shares
+        self.totals = totals
+        self.errors = errors
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def tenant_shares(self, i):
+        return [float(s) for s in self.shares[i]]
+
+    def row(self, i):
+        # (label, monthly total, lowest share, highest share), or the
+        # error in place of the numbers
+        scenario = self.scenarios[i]
+        if i in self.errors:
+            return scenario.label, self.errors[i], None, None
+        shares = self.tenant_shares(i)
+        return scenario.label, self.totals[i], min(shares), max(shares)
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+    return True
@@ -0,0 +1,193 @@
+import calendar
+import datetime
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from rent_cache import SplitCache
+from rent_report import FORMATS, render_report
+from rent_profile import phase, count
+
+# HTTP/JSON front end to the split engine, for services that can't drive
+# the GUI. Each request is handled on its own thread.
+#   GET  /health        {"status": "ok"}
+#   POST /split         one household (the rent_data shape) ->
+#                       {"result": {...shares...}, "report": "..."}
+#   POST /split/batch   a list of households, or {"households": [...]} ->
+#                       {"results": [...], "failed": n}; a household that
+#                       can't be split gets {"error": "..."} in its place
+# Query parameters: exact=1 for integer-paise shares, report=text|csv|html
+# or none, period="January 2026" (default: the household's year and
+# month, as in batch input, or the current month).
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# requests bigger than this are refused before being read
+MAX_BODY = 64 * 1024 * 1024
+MAX_BATCH = 10_000
+
+SPLIT_ERRORS = (ValueError, KeyError, TypeError, AttributeError, IndexError, OverflowError)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache_size=1024, quiet=False):
+        super().__init__(address, RentRequestHandler)
+        # shared by every request thread; SplitCache locks internally
+        self.split_cache = SplitCache(cache_size)
+        self.quiet = quiet
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class RentRequestHandler(BaseHTTPRequestHandler):
+    # keep-alive, so a client can reuse its connection; without Nagle
+    # the response body isn't held back waiting on the client's delayed
+    # ACK of the headers (~40 ms per request)
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_version = 'RentCalculator/1.0'
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        else:
+            self.send_json(404, {'error': f"Not found: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            if url.path not in ('/split', '/split/batch'):
+                raise RequestError(404, f"Not found: {url.path}")
+            options = self.options(parse_qs(url.query))
+            body = self.read_json()
+            if url.path == '/split':
+                count('server.split')
+                try:
+                    response = split_request(body, self.server.split_cache, *options)
+                except SPLIT_ERRORS as e:
+                    raise RequestError(400, str(e)) from None
+            else:
+                count('server.batch')
+                households = body.get('households') if isinstance(body, dict) else body
+                if not isinstance(households, list):
+                    raise RequestError(400, "Expected a list of households")
+                if len(households) > MAX_BATCH:
+                    raise RequestError(413, f"At most {MAX_BATCH} households per batch")
+                response = split_batch(households, self.server.split_cache, *options)
+        except RequestError as e:
+            # the body may not have been read; don't reuse the connection
+            self.close_connection = True
+            self.send_json(e.status, {'error': str(e)})
+            return
+        self.send_json(200, response)
+
+    def options(self, query):
+        def value(name, default=None):
+            return query[name][-1] if name in query else default
+
+        exact = value('exact', '0').lower() in ('1', 'true', 'yes')
+        fmt = value('report', 'text')
+        if fmt == 'none':
+            fmt = None
+        elif fmt not in FORMATS:
+            raise RequestError(400, f"Unknown report format: {fmt}")
+        return exact, fmt, value('period')
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length") from None
+        if length < 0:
+            raise RequestError(400, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise RequestError(413, "Request body too large")
+        with phase('server.read'):
+            try:
+                return json.loads(self.rfile.read(length))
+            except (ValueError, UnicodeDecodeError) as e:
+                raise RequestError(400, f"Invalid JSON: {e}") from None
+
+    def send_json(self, status, data):
+        with phase('server.encode'):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def split_request(household, cache, exact=False, fmt='text', period=None, now=None):
+    if not isinstance(household, dict):
+        raise ValueError("A household must be a JSON object")
+    with phase('server.compute'):
+        result = cache.split(household, exact)
+    response = {'result': result}
+    if 'id' in household:
+        response['id'] = household['id']
+    if fmt:
+        now = now or datetime.datetime.now()
+        if period is None:
+            year, month = household.get('year', now.year), household.get('month', now.month)
+            period = f"{calendar.month_name[month]} {year}"
+        with phase('server.format'):
+            response['report'] = render_report(household, result, period, fmt, generated_on=now)
+    return response
+
+
+def split_batch(households, cache, exact=False, fmt='text', period=None):
+    now = datetime.datetime.now()
+    results = []
+    failed = 0
+    for household in households:
+        try:
+            results.append(split_request(household, cache, exact, fmt, period, now))
+        except SPLIT_ERRORS as e:
+            results.append({'error': str(e)})
+            failed += 1
+    count('server.households', len(households))
+    return {'results': results, 'failed': failed}
+
+
+def make_server(host=HOST, port=PORT, cache_size=1024, quiet=False):
+    # port 0 picks a free port; see server.url
+    return RentServer((host, port), cache_size, quiet)
+
+
+def start_server(host=HOST, port=0, quiet=True):
+    # runs a server on a background thread, for tests and benchmarks;
+    # stop it with server.shutdown()
+    server = make_server(host, port, quiet=quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(host=HOST, port=PORT, quiet=False):
+    server = make_server(host, port, quiet=quiet)
+    print(f"Serving rent splits on {server.url} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,348 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping, Sequence
+
+from rent_storage import atomic_write
+
+SNAPSHOT_FILE = 'rent_calculator_data.snap'
+
+# Binary snapshot of one household, written next to the JSONL log on
+# close so the next start doesn't have to parse it. Layout:
+#     b'RENTSNAP', version (uint32), header length (uint32)
+#     header: JSON with everything but the tenants, the tenant count and
+#             totals, and where each section starts
+#     sections, 8-byte aligned:
+#         room_size, percentage       float64 per tenant
+#         usage.<i>                   float64 per tenant for utility i
+#                                     (NaN: no reading)
+#         names, ids                  string tables: int64 offsets (one
+#                                     more than tenants) + UTF-8 bytes
+#         ids.sorted                  int64 rows in id order, so an id is
+#                                     found by bisection
+#         extra.rows, extra           rows with other keys (move-in and
+#                                     move-out dates...) + their JSON
+# The file is opened with mmap, so a tenant is only read from disk when
+# it's first used. JSON stays the import/export format: the log is
+# still written as before and the snapshot is only used while it
+# matches the log it was taken from (see log_stamp()).
+
+MAGIC = b'RENTSNAP'
+VERSION = 1
+PREFIX = struct.Struct('<8sII')
+BASE_KEYS = ('name', 'room_size', 'percentage', 'id', 'usage')
+
+# TenantIndex decodes ids this many at a time as it's iterated
+ID_CHUNK = 65536
+
+
+def log_stamp(path):
+    # size and modification time of the log; any save changes them
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_snapshot(path, household, year=None, month=None, source=None):
+    tenants = list(household.get('tenants', []))
+    n = len(tenants)
+    sections, parts = {}, []
+    size = 0
+
+    def add(name, data):
+        nonlocal size
+        data = bytes(data)
+        sections[name] = [size, len(data)]
+        parts.append(data + b'\0' * (-len(data) % 8))
+        size += len(data) + (-len(data) % 8)
+
+    add('room_size', array('d', [t.get('room_size', 0) for t in tenants]))
+    add('percentage', array('d', [t.get('percentage', 0) for t in tenants]))
+    usage_names = list(dict.fromkeys(name for t in tenants for name in (t.get('usage') or {})))
+    for i, name in enumerate(usage_names):
+        add(f'usage.{i}', array('d', [(t.get('usage') or {}).get(name, float('nan')) for t in tenants]))
+    ids = [t.get('id') or '' for t in tenants]
+    for name, strings in (('names', [t['name'] for t in tenants]), ('ids', ids)):
+        offsets, data = _string_table(strings)
+        add(f'{name}.offsets', offsets)
+        add(name, data)
+    add('ids.sorted', array('q', sorted(range(n), key=ids.__getitem__)))
+    extra_rows, extras = array('q'), []
+    for row, tenant in enumerate(tenants):
+        extra = {k: v for k, v in tenant.items() if k not in BASE_KEYS}
+        if extra:
+            extra_rows.append(row)
+            extras.append(json.dumps(extra, ensure_ascii=False))
+    offsets, data = _string_table(extras)
+    add('extra.rows', extra_rows)
+    add('extra.offsets', offsets)
+    add('extra', data)
+
+    header = {
+        'household': {k: v for k, v in household.items() if k != 'tenants'},
+        'year': year,
+        'month': month,
+        'source': source,
+        'byteorder': sys.byteorder,
+        'tenants': n,
+        # summed in tenant order, as SplitModel.recount() does
+        'room_size_total': sum(t.get('room_size', 0) for t in tenants),
+        'percentage_total': sum(t.get('percentage', 0) for t in tenants),
+        # every tenant has an id and no two share one
+        'indexed': all(ids) and len(set(ids)) == n,
+        'usage': usage_names,
+        'sections': sections
+    }
+    header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-(PREFIX.size + len(header)) % 8)
+    atomic_write(path, b''.join([PREFIX.pack(MAGIC, VERSION, len(header)), header] + parts))
+
+
+def open_snapshot(path=SNAPSHOT_FILE, source=None):
+    # the snapshot, or None when there is none, it can't be read here or
+    # it wasn't taken from the log as it is now (source is log_stamp())
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError):
+        return None
+    if source is not None and snapshot.source != source:
+        snapshot.close()
+        return None
+    return snapshot
+
+
+class Snapshot:
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, length = PREFIX.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a rent snapshot")
+            self.header = json.loads(self._mmap[PREFIX.size:PREFIX.size + length])
+            if self.header['byteorder'] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {self.header['byteorder']}-endian machine")
+            self._base = PREFIX.size + length
+            self._view = memoryview(self._mmap)
+        except (struct.error, KeyError, UnicodeDecodeError) as e:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a rent snapshot: {e}") from None
+        except ValueError:
+            self._mmap.close()
+            raise
+        self._columns = {}
+
+    def __len__(self):
+        return self.header['tenants']
+
+    @property
+    def source(self):
+        return self.header['source']
+
+    @property
+    def period(self):
+        return self.header['year'], self.header['month']
+
+    def close(self):
+        # the mmap can only be closed once no view into it is left
+        for column in self._columns.values():
+            column.release()
+        self._columns.clear()
+        self._view.release()
+        self._mmap.close()
+
+    def household(self):
+        # rent_data whose tenants are read from the file as they're used
+        household = dict(self.header['household'])
+        household['tenants'] = SnapshotTenants(self)
+        return household
+
+    def to_dict(self):
+        # the household as plain rent_data, e.g. to export as JSON
+        household = dict(self.header['household'])
+        household['tenants'] = [self.tenant(row) for row in range(len(self))]
+        return household
+
+    def tenant(self, row):
+        room_size, percentage = self._column('room_size'), self._column('percentage')
+        tenant = {'name': self._string('names', row), 'room_size': room_size[row],
+                  'percentage': percentage[row]}
+        tenant_id = self._string('ids', row)
+        if tenant_id:
+            tenant['id'] = tenant_id
+        usage = {}
+        for i, name in enumerate(self.header['usage']):
+            reading = self._column(f'usage.{i}')[row]
+            if not math.isnan(reading):
+                usage[name] = reading
+        if usage:
+            tenant['usage'] = usage
+        extra_rows = self._column('extra.rows', 'q')
+        i = bisect.bisect_left(extra_rows, row)
+        if i < len(extra_rows) and extra_rows[i] == row:
+            tenant.update(json.loads(self._string('extra', i)))
+        return tenant
+
+    def ids(self, start=0, stop=None):
+        return self._strings('ids', start, len(self) if stop is None else min(stop, len(self)))
+
+    def row(self, tenant_id):
+        # the row of the tenant with this id, or None
+        order = self._column('ids.sorted', 'q')
+        i = bisect.bisect_left(_SortedIds(self, order), tenant_id)
+        if i < len(order) and self._string('ids', order[i]) == tenant_id:
+            return order[i]
+        return None
+
+    def _section(self, name):
+        start, length = self.header['sections'][name]
+        return self._base + start, self._base + start + length
+
+    def _column(self, name, fmt='d'):
+        column = self._columns.get(name)
+        if column is None:
+            start, stop = self._section(name)
+            column = self._columns[name] = self._view[start:stop].cast(fmt)
+        return column
+
+    def _string(self, name, row):
+        offsets = self._column(f'{name}.offsets', 'q')
+        start = self._section(name)[0]
+        return self._mmap[start + offsets[row]:start + offsets[row + 1]].decode('utf-8')
+
+    def _strings(self, name, first, last):
+        # rows first up to last of a string table
+        offsets = self._column(f'{name}.offsets', 'q')[first:last + 1].tolist()
+        if not offsets:
+            return []
+        base = self._section(name)[0]
+        data = self._mmap[base + offsets[0]:base + offsets[-1]]
+        offsets = [offset - offsets[0] for offset in offsets]
+        text = data.decode('utf-8')
+        if len(text) != len(data):
+            return [data[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+        # ASCII: byte offsets are character offsets
+        return [text[a:b] for a, b in zip(offsets, offsets[1:])]
+
+
+class _SortedIds(Sequence):
+    # the snapshot's ids in sorted order, decoded as bisect asks for them
+
+    def __init__(self, snapshot, order):
+        self.snapshot = snapshot
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.snapshot._string('ids', self.order[i])
+
+
+class SnapshotTenants(Sequence):
+    # a snapshot's tenants as rent_data tenant dicts, each built on first
+    # access and kept, so edits to it stick
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        header = snapshot.header
+        self.totals = (header['room_size_total'], header['percentage_total'])
+        self._tenants = {}
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        tenant = self._tenants.get(row)
+        if tenant is None:
+            tenant = self._tenants[row] = self.snapshot.tenant(row)
+        return tenant
+
+    def by_id(self):
+        # a TenantIndex for SplitModel, or None when the ids can't be
+        # trusted to be there and unique
+        return TenantIndex(self) if self.snapshot.header['indexed'] else None
+
+
+class TenantIndex(MutableMapping):
+    # {id: tenant} over SnapshotTenants, the form SplitModel keeps tenants
+    # in. Iterating reads the ids ID_CHUNK at a time; lookups bisect the
+    # file's sorted ids. Tenants added later go after the snapshot's,
+    # removed ones are skipped.
+
+    def __init__(self, tenants):
+        self.tenants = tenants
+        self._removed = set()
+        self._added = {}
+
+    def _row(self, tenant_id):
+        if not isinstance(tenant_id, str):
+            return None
+        row = self.tenants.snapshot.row(tenant_id)
+        return None if row in self._removed else row
+
+    def __len__(self):
+        return len(self.tenants) - len(self._removed) + len(self._added)
+
+    def __iter__(self):
+        snapshot = self.tenants.snapshot
+        for start in range(0, len(snapshot), ID_CHUNK):
+            ids = snapshot.ids(start, start + ID_CHUNK)
+            if self._removed:
+                ids = [tenant_id for row, tenant_id in enumerate(ids, start) if row not in self._removed]
+            yield from ids
+        yield from self._added
+
+    def __contains__(self, tenant_id):
+        return tenant_id in self._added or self._row(tenant_id) is not None
+
+    def __getitem__(self, tenant_id):
+        if tenant_id in self._added:
+            return self._added[tenant_id]
+        row = self._row(tenant_id)
+        if row is None:
+            raise KeyError(tenant_id)
+        return self.tenants[row]
+
+    def __setitem__(self, tenant_id, tenant):
+        row = self._row(tenant_id)
+        if row is None:
+            self._added[tenant_id] = tenant
+        else:
+            self.tenants._tenants[row] = tenant
+
+    def __delitem__(self, tenant_id):
+        if tenant_id in self._added:
+            del self._added[tenant_id]
+            return
+        row = self._row(tenant_id)
+        if row is None:
+            raise KeyError(tenant_id)
+        self._removed.add(row)
+        self.tenants._tenants.pop(row, None)
+
+
+def _string_table(strings):
+    offsets, chunks = array('q', [0]), []
+    end = 0
+    for s in strings:
+        data = s.encode('utf-8')
+        chunks.append(data)
+        end += len(data)
+        offsets.append(end)
+    return offsets, b''.join(chunks)
@@ -0,0 +1,231 @@
+import datetime
+import json
+import os
+import threading
+import time
+
+DATA_FILE = 'rent_calculator_data.jsonl'
+LEGACY_DATA_FILE = 'rent_calculator_data.json'
+
+
+class RentLog:
+    # Append-only store: one JSON record per line in the log and one
+    # "offset<TAB>household<TAB>year<TAB>month" line per record in a
+    # sidecar index. Reading a household/period seeks straight to its
+    # latest record; the rest of the log is never parsed.
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.index_path = path + '.idx'
+        self._index = None
+        self._last = None
+        self._records = 0
+
+    def append(self, data, household='default', year=None, month=None):
+        return self.write(self.encode(data, household, year, month), household, year, month)
+
+    def encode(self, data, household='default', year=None, month=None):
+        record = {
+            'household': household,
+            'year': year,
+            'month': month,
+            'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'data': data
+        }
+        return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def write(self, line, household='default', year=None, month=None):
+        # a record is one write() followed by fsync; a line torn by a
+        # crash is skipped when the index is rebuilt, and ended here so
+        # the next record starts on a line of its own
+        index = self._load_index()
+        with open(self.path, 'a+b') as f:
+            offset = f.seek(0, os.SEEK_END)
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+                    offset += 1
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._add_to_index(index, offset, household, year, month, persist=True)
+        return offset
+
+    def needs_compaction(self, min_records=100):
+        index = self._load_index()
+        return self._records >= min_records and self._records > 2 * len(index)
+
+    def compact(self):
+        # keep only the latest record of every household/period; the new
+        # files are swapped in with os.replace so a crash leaves either
+        # the old log or the new one, never a mix
+        index = self._load_index()
+        entries = sorted((offset, key) for key, offset in index.items())
+        new_index = {}
+        with open(self.path, 'rb') as src, open(self.path + '.tmp', 'wb') as dst:
+            for offset, key in entries:
+                src.seek(offset)
+                new_index[key] = dst.tell()
+                dst.write(src.readline())
+            dst.flush()
+            os.fsync(dst.fileno())
+        index_lines = ''.join(f"{offset}\t{h}\t{'' if y is None else y}\t{'' if m is None else m}\n"
+                              for (h, y, m), offset in new_index.items())
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(self.path + '.tmp', self.path)
+        atomic_write(self.index_path, index_lines.encode('utf-8'))
+        self._index = new_index
+        self._records = len(new_index)
+        self._last = max(new_index.values(), default=None)
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    yield record
+
+    def get(self, household='default', year=None, month=None):
+        offset = self._load_index().get((household, year, month))
+        return None if offset is None else self._read_at(offset)
+
+    def last(self):
+        self._load_index()
+        return None if self._last is None else self._read_at(self._last)
+
+    def periods(self, household='default'):
+        return sorted((y, m) for h, y, m in self._load_index() if h == household)
+
+    def import_json(self, path=LEGACY_DATA_FILE, household='default'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return self.append(data, household)
+
+    def _read_at(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 4:
+                        self._add_to_index(index, int(parts[0]), parts[1],
+                                           _int_or_none(parts[2]), _int_or_none(parts[3]))
+
+        # pick up records the index missed (e.g. a crash between writes)
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                if self._last is not None:
+                    f.seek(self._last)
+                    f.readline()
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._add_to_index(index, offset, record.get('household', 'default'),
+                                           record.get('year'), record.get('month'), persist=True)
+
+        self._index = index
+        return index
+
+    def _add_to_index(self, index, offset, household, year, month, persist=False):
+        index[(household, year, month)] = offset
+        self._records += 1
+        if self._last is None or offset > self._last:
+            self._last = offset
+        if persist:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(f"{offset}\t{household}\t{'' if year is None else year}\t"
+                        f"{'' if month is None else month}\n")
+
+
+class Autosaver:
+    # Write-behind saving. mark() only flags the state dirty; a background
+    # thread waits until no new marks arrive for `delay` seconds (at most
+    # `max_delay`), takes one snapshot while holding `lock` and writes it
+    # outside the lock. A burst of edits therefore costs a single write and
+    # the caller never waits on the disk. Whoever mutates the state must
+    # hold the same lock.
+
+    def __init__(self, snapshot, write, lock=None, delay=0.5, max_delay=5.0):
+        self.snapshot = snapshot
+        self.write = write
+        self.lock = lock or threading.Lock()
+        self.delay = delay
+        self.max_delay = max_delay
+        self.writes = 0
+        self._pending = False
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+
+    def mark(self):
+        self._pending = True
+        self._wake.set()
+
+    def flush(self):
+        with self._write_lock:
+            if not self._pending:
+                return
+            with self.lock:
+                self._pending = False
+                payload = self.snapshot()
+            try:
+                self.write(payload)
+                self.writes += 1
+            except Exception as e:
+                self._pending = True
+                print(f"Error saving data: {e}")
+
+    def close(self):
+        self._closing.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._closing.is_set():
+            self._wake.wait()
+            deadline = time.monotonic() + self.max_delay
+            while not self._closing.is_set():
+                self._wake.clear()
+                quiet = min(self.delay, deadline - time.monotonic())
+                if quiet <= 0 or not self._wake.wait(quiet):
+                    break
+            if not self._closing.is_set():
+                self.flush()
+
+
+def atomic_write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _int_or_none(value):
+    return int(value) if value else None
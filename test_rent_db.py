@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import tempfile
+
+from rent_db import RentDatabase
+from rent_engine import split_household
+
+
+def household(tenants):
+    return {'rent_amount': 9000, 'maintenance': 0, 'security_deposit': 0, 'split_type': 'equal',
+            'utilities': {}, 'tenants': tenants}
+
+
+def test_same_name_tenants_have_separate_histories():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = RentDatabase(os.path.join(tmp, 'rent.db'))
+        for month, tenants in ((1, ['a1', 'a2', 'r']), (2, ['a1', 'r'])):
+            data = household([{'id': t, 'name': 'Ravi' if t == 'r' else 'Asha'} for t in tenants])
+            db.save_period('h', 2026, month, data, split_household(data))
+        assert [(row['month'], row['name'], row['share']) for row in db.tenant_history('a1')] == \
+            [(2, 'Asha', 4500), (1, 'Asha', 3000)]
+        assert [row['month'] for row in db.tenant_history('a2')] == [1]
+        assert db.tenant_history('Asha') == []
+        db.close()
+
+
+def test_older_shares_take_their_tenant_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rent.db')
+        data = household([{'id': 'a1', 'name': 'Asha'}, {'name': 'Ravi'}])
+        db = RentDatabase(path)
+        db.save_period('h', 2026, 1, data, split_household(data))
+        db.close()
+        # back to the schema without shares.tenant_id
+        conn = sqlite3.connect(path)
+        conn.executescript('''
+            DROP INDEX shares_by_tenant_id;
+            CREATE TABLE old_shares AS SELECT period_id, position, tenant_name, percentage, share FROM shares;
+            DROP TABLE shares;
+            ALTER TABLE old_shares RENAME TO shares;
+            CREATE INDEX shares_by_tenant ON shares (tenant_name, period_id);
+        ''')
+        conn.close()
+        db = RentDatabase(path)
+        assert [row['name'] for row in db.tenant_history('a1')] == ['Asha']
+        assert [row['name'] for row in db.tenant_history('Ravi')] == ['Ravi']
+        indexes = [row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        assert 'shares_by_tenant_id' in indexes and 'shares_by_tenant' not in indexes
+        db.close()
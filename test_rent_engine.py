@@ -0,0 +1,56 @@
+import pytest
+
+from rent_engine import _split_portfolio_loop, split_household, split_households, split_portfolio
+
+
+def test_exact_portfolio_matches_loop_at_large_totals():
+    pytest.importorskip('numpy')
+    households = [{'rent_amount': 1e7, 'maintenance': 5000, 'split_type': 'room',
+                   'utilities': {'Power': {'amount': 3333.33, 'split_method': 'Equal'}},
+                   'tenants': [{'name': f"Tenant {j}", 'room_size': 100 + 7 * j} for j in range(count)]}
+                  for count in (1, 2, 3, 7)]
+    vector = split_portfolio(households, exact=True)
+    loop = _split_portfolio_loop(households, exact=True)
+    assert [int(p) for p in vector['share_paise']] == loop['share_paise']
+    assert [int(p) for p in vector['total_paise']] == loop['total_paise']
+
+
+@pytest.mark.parametrize('amounts', [
+    {'rent_amount': float('nan')},
+    {'rent_amount': float('inf')},
+    {'rent_amount': 10000, 'maintenance': float('nan')},
+    {'rent_amount': 10000, 'utilities': {'Power': {'amount': float('-inf'), 'split_method': 'Equal'}}},
+    {'rent_amount': 10 ** 400},
+    {'rent_amount': 10000, 'maintenance': 10 ** 400},
+])
+def test_non_finite_amounts_are_rejected(amounts):
+    household = dict(amounts, tenants=[{'name': 'Asha'}, {'name': 'Ravi'}])
+    with pytest.raises(ValueError):
+        split_household(household, exact=True)
+    assert list(_split_portfolio_loop([household], exact=True)['errors']) == [0]
+    assert 'error' in split_households([household, {'rent_amount': 100, 'tenants': [{'name': 'Asha'}]}])[0]
+
+
+@pytest.mark.parametrize('field, value', [
+    ('rent_amount', '10000'), ('maintenance', '500'), ('room_size', '5'), ('percentage', '60'),
+    ('amount', '900'), ('room_size', 10 ** 400), ('room_size', float('nan')), ('maintenance', None),
+])
+@pytest.mark.parametrize('split_type', ['equal', 'room', 'custom'])
+def test_portfolio_paths_agree_on_odd_values(field, value, split_type):
+    np = pytest.importorskip('numpy')
+    household = {'rent_amount': 10000, 'maintenance': 500, 'split_type': split_type,
+                 'utilities': {'Power': {'amount': 900, 'split_method': 'Equal'}},
+                 'tenants': [{'name': 'Asha', 'room_size': 100, 'percentage': 60},
+                             {'name': 'Ravi', 'room_size': 50, 'percentage': 40}]}
+    if field in ('rent_amount', 'maintenance'):
+        household[field] = value
+    elif field == 'amount':
+        household['utilities']['Power']['amount'] = value
+    else:
+        household['tenants'][0][field] = value
+    households = [household, dict(household, rent_amount=8000, maintenance=0)]
+    for exact in (False, True):
+        vector = split_portfolio(households, exact)
+        loop = _split_portfolio_loop(households, exact)
+        assert vector['errors'] == loop['errors']
+        assert np.allclose(vector['share'], np.array(loop['share'], dtype=float), equal_nan=True)
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+from rent_engine import split_household, to_paise
+from rent_ledger import PaymentLedger
+from rent_portfolio import run_portfolio
+
+
+def household(tenants):
+    return {'rent_amount': 10000, 'maintenance': 0, 'security_deposit': 0, 'split_type': 'equal',
+            'utilities': {}, 'tenants': tenants}
+
+
+def tenant(tenant_id, name):
+    return {'id': tenant_id, 'name': name, 'room_size': 0, 'percentage': 0, 'usage': {}}
+
+
+def charges(ledger, year, month):
+    return dict(ledger.conn.execute(
+        "SELECT tenant, amount FROM ledger WHERE household = 'h' AND year = ? AND month = ? AND kind = 'charge'",
+        (year, month)).fetchall())
+
+
+def test_same_name_tenants_have_separate_accounts():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = PaymentLedger(os.path.join(tmp, 'ledger.db'))
+        result = split_household(household([tenant('a1', 'Asha'), tenant('a2', 'Asha'), tenant('r', 'Ravi')]))
+        ledger.post_charges('h', 2026, 3, result)
+        ledger.record_payment('h', 'a1', 1000, '2026-03-10')
+        posted = charges(ledger, 2026, 3)
+        assert sorted(posted) == ['a1', 'a2', 'r']
+        assert sum(posted.values()) == to_paise(result['total_monthly'])
+        assert ledger.balance('h', 'a1') == posted['a1'] / 100 - 1000
+        assert ledger.balance('h', 'a2') == posted['a2'] / 100
+        assert sorted(row['name'] for row in ledger.arrears('2026-03-31')) == ['Asha', 'Asha', 'Ravi']
+        ledger.close()
+
+
+def test_reposting_zeroes_removed_tenant():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = PaymentLedger(os.path.join(tmp, 'ledger.db'))
+        tenants = [tenant('a', 'Asha'), tenant('b', 'Bela'), tenant('r', 'Ravi')]
+        ledger.post_charges('h', 2026, 3, split_household(household(tenants)))
+        result = split_household(household(tenants[:2]))
+        ledger.post_charges('h', 2026, 3, result)
+        posted = charges(ledger, 2026, 3)
+        assert posted['r'] == 0
+        assert ledger.balance('h', 'r') == 0
+        assert sum(posted.values()) == to_paise(result['total_monthly'])
+        assert [row['tenant'] for row in ledger.arrears('2026-03-31') if row['tenant'] == 'r'] == []
+        ledger.close()
+
+
+def test_charges_add_up_to_the_total():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = PaymentLedger(os.path.join(tmp, 'ledger.db'))
+        result = split_household(household([tenant(f"t{i}", f"Tenant {i}") for i in range(3)]))
+        ledger.post_charges('h', 2026, 3, result)
+        assert sum(charges(ledger, 2026, 3).values()) == 1000000
+        ledger.close()
+
+
+def test_batch_with_a_period_twice_posts_the_last_line():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, db = os.path.join(tmp, 'in.jsonl'), os.path.join(tmp, 'rent.db')
+        first = dict(household([tenant('a', 'Asha'), tenant('r', 'Ravi')]), id='h', year=2026, month=3)
+        second = dict(household([tenant('a', 'Asha')]), id='h', year=2026, month=3, rent_amount=8000)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(first) + '\n' + json.dumps(second) + '\n')
+        assert run_portfolio(path, os.devnull, db_path=db) == (2, 0, 0)
+        ledger = PaymentLedger(db)
+        assert charges(ledger, 2026, 3) == {'a': 800000}
+        ledger.close()
@@ -0,0 +1,41 @@
+import http.client
+import json
+
+from rent_server import start_server
+
+
+def post(server, path, body, headers=None):
+    host, port = server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.putrequest('POST', path)
+    for name, value in (headers or {'Content-Length': str(len(body))}).items():
+        conn.putheader(name, value)
+    conn.endheaders(body)
+    response = conn.getresponse()
+    status, data = response.status, json.loads(response.read())
+    conn.close()
+    return status, data
+
+
+def test_negative_content_length_is_refused():
+    server = start_server()
+    try:
+        status, data = post(server, '/split', b'{}', {'Content-Length': '-1'})
+        assert status == 400
+        assert 'Content-Length' in data['error']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rent_too_big_for_a_float_is_a_bad_request():
+    server = start_server()
+    try:
+        body = ('{"rent_amount": 1' + '0' * 400 + ', "tenants": [{"name": "Asha"}]}').encode()
+        status, data = post(server, '/split', body)
+        assert status == 400
+        status, data = post(server, '/split/batch', b'[' + body + b']')
+        assert status == 200 and data['failed'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import threading
+import time
+
+from rent_engine import SplitModel
+from rent_storage import Autosaver, RentLog
+
+
+def test_append_after_torn_line():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.jsonl')
+        RentLog(path).append({'rent_amount': 1000}, year=2026, month=1)
+        with open(path, 'ab') as f:
+            f.write(b'{"household": "default", "year": 2026, "mon')
+        log = RentLog(path)
+        log.append({'rent_amount': 2000}, year=2026, month=2)
+        assert [record['data']['rent_amount'] for record in log.records()] == [1000, 2000]
+
+        os.remove(path + '.idx')
+        log = RentLog(path)
+        assert log.get('default', 2026, 2)['data'] == {'rent_amount': 2000}
+        assert log.periods() == [(2026, 1), (2026, 2)]
+
+
+def test_autosaver_coalesces_a_burst_of_edits():
+    model = SplitModel({'rent_amount': 10000, 'split_type': 'equal'})
+    lock = threading.Lock()
+    saved = []
+    autosaver = Autosaver(lambda: len(model.sync()), saved.append, lock, delay=0.05, max_delay=0.2)
+    started = time.monotonic()
+    for i in range(10000):
+        with lock:
+            model.add_tenant({'name': f"Tenant {i}", 'room_size': 0, 'percentage': 0})
+        autosaver.mark()
+    elapsed = time.monotonic() - started
+    autosaver.close()
+    # at most one write per max_delay during the burst, plus the last one
+    assert 1 <= autosaver.writes <= elapsed / 0.2 + 2
+    assert saved[-1] == 10000